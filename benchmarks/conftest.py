@@ -0,0 +1,66 @@
+"""Benchmarks of the conversion pipeline on synthetic pages of growing size.
+
+A baseline is committed in `benchmarks/baseline`. Compare with it and fail on a
+regression of the mean::
+
+    $ pytest benchmarks -o addopts="" --benchmark-storage=benchmarks/baseline \\
+        --benchmark-compare=0001 --benchmark-compare-fail=mean:100%
+
+The options in setup.cfg are cleared not to measure the coverage. The threshold
+is loose because the baseline was taken on another machine, so that only a
+regression of the complexity fails. Store a new baseline with
+`--benchmark-save=baseline` and move it from the directory of the machine to
+`benchmarks/baseline`, so that it is compared on any machine.
+"""
+import pytest
+
+SIZES = [10, 100, 1000]
+
+
+def make_source(size: int) -> str:
+    """Return a Markdown source which has `size` sections."""
+    lines = []
+    for k in range(size):
+        lines.extend(
+            [
+                f"## Section {k}",
+                "",
+                f"Text with an inline code {{{{{k}+1}}}} and a link {{#fig:{k}#}}.",
+                "",
+                "```python",
+                f"x{k} = {k}",
+                "```",
+                "",
+                f"#Fig Figure {k} {{#fig:{k}#}}",
+                "<div>Content</div>",
+                "",
+            ]
+        )
+    return "\n".join(lines)
+
+
+def make_script(size: int) -> str:
+    """Return a Python source which has `size` sections."""
+    blocks = []
+    for k in range(size):
+        blocks.append(
+            f"# ## Section {k}\n# Text of a comment\n# which is formatted.\n\n"
+            f"x{k} = {k}\nprint(x{k})\n\n\n"
+            f'def func{k}():\n    """Docstring."""\n    return {k}\n\n\n'
+        )
+    return "".join(blocks)
+
+
+@pytest.fixture(params=SIZES)
+def size(request):
+    return request.param
+
+
+@pytest.fixture
+def source(size):
+    return make_source(size)
+
+
+@pytest.fixture
+def script_source(size):
+    return make_script(size)
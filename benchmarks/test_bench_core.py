@@ -0,0 +1,85 @@
+import pytest
+
+from pheasant.core.page import Cache
+from pheasant.core.pheasant import Pheasant
+
+
+def make_converter() -> Pheasant:
+    converter = Pheasant()
+    converter.jupyter.set_config(enabled=False)
+    return converter
+
+
+def test_parser_split(benchmark, source):
+    parser = make_converter().parsers["main"]
+
+    def split():
+        return sum(1 for _ in parser.split(source))
+
+    assert benchmark(split) > 0
+
+
+def test_parser_parse(benchmark, source):
+    converter = make_converter()
+
+    def parse():
+        converter.header.start()
+        return converter.parse(source, "main")
+
+    assert "Section" in benchmark(parse)
+
+
+def resolve_by_groupdict(match):
+    """Resolve a match by its groupdict as `Parser.resolve` did before."""
+    render_name = ""
+
+    def rename_for_render(key):
+        nonlocal render_name
+        if "___" in key:
+            return key.split("___")[-1]
+        render_name = key
+        return "_source"
+
+    context = {
+        rename_for_render(key): value
+        for key, value in match.groupdict().items()
+        if value is not None
+    }
+    return render_name, context
+
+
+@pytest.mark.parametrize("method", ["dispatch", "groupdict"])
+def test_parser_resolve(benchmark, source, method):
+    parser = make_converter().parsers["main"]
+    parser.compile()
+    matches = list(parser.pattern.finditer(source))
+    resolve = parser.resolve if method == "dispatch" else resolve_by_groupdict
+
+    def resolve_all():
+        return [resolve(match) for match in matches]
+
+    assert len(benchmark(resolve_all)) == len(matches)
+
+
+def test_link(benchmark, source):
+    converter = make_converter()
+    output = converter.parse(source, "main")
+    output = benchmark(converter.parse, output, "link")
+    assert "[1](#fig:0)" in output
+
+
+def test_cache_save_load(benchmark, tmpdir, size):
+    cache = Cache()
+    cache.page_path = tmpdir.join("a.md").strpath
+    outputs = [{"type": "execute_result", "data": {"text/plain": "1" * 100}}]
+    items = [
+        {"key": str(k), "extra_module": "", "outputs": outputs, "output": "x" * 500}
+        for k in range(size)
+    ]
+
+    def save_load():
+        cache.save(items, {"extra_html": ""}, index=["key", "extra_module"])
+        items_, _ = cache.load()  # type: ignore
+        return [item.load() for item in items_]
+
+    assert len(benchmark(save_load)) == size
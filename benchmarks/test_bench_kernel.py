@@ -0,0 +1,16 @@
+import pytest
+
+from pheasant.renderers.jupyter.kernel import Kernel, kernels
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_kernel_cold_start(benchmark, lazy):
+    kernel_name = kernels.get_kernel_name("python")
+
+    def start():
+        kernel = Kernel(kernel_name)
+        kernel.init_code = kernel.init_code.replace("()", f"(lazy={lazy})")
+        kernel.start()
+        kernel.shutdown()
+
+    benchmark.pedantic(start, rounds=3, iterations=1)
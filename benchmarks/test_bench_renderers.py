@@ -0,0 +1,44 @@
+from pheasant.core.page import Page
+from pheasant.renderers.jupyter.jupyter import Jupyter
+from pheasant.renderers.number.number import Header
+from pheasant.renderers.script.script import Script
+
+
+def test_header_resolve(benchmark, source):
+    header = Header()
+    contexts = [
+        cell.context
+        for cell in header.parser.split(source)
+        if cell.match and cell.render_name == "header__header"
+    ]
+
+    def resolve():
+        header.start()
+        return [header.resolve(dict(context)) for context in contexts]
+
+    assert len(benchmark(resolve)) == len(contexts)
+
+
+def test_jupyter_warm_cache(benchmark, tmpdir, size):
+    jupyter = Jupyter()
+    jupyter.set_config(progress=False)
+    jupyter.page = Page(tmpdir.join("a.md").strpath)
+    codes = [f"x{k} = {k}\nx{k}" for k in range(size)]
+
+    def run():
+        jupyter.enter()
+        outputs = []
+        for code in codes:
+            context = {"code": code, "language": "python", "option": ""}
+            outputs.append(jupyter.execute_and_render(code, context, "fenced_code"))
+        jupyter.exit()
+        return outputs
+
+    run()
+    outputs = benchmark(run)
+    assert all("cached" in output for output in outputs)
+
+
+def test_script_convert(benchmark, script_source):
+    script = Script()
+    assert "Section" in benchmark(script.convert, script_source, 0)
@@ -5,10 +5,10 @@ from pheasant.core.pheasant import Pheasant
 
 
 class App:
-    def __init__(self, paths, ext):
+    def __init__(self, paths, ext, ignore=()):
         self.api = responder.API()
         self.store = {}
-        self.store["pages"] = Pages(paths, ext)
+        self.store["pages"] = Pages(paths, ext, ignore)
         self.store["pages"].collect()
         self.api.add_route("/pages", self.pages)
         self.api.add_route("/pages/{id}", self.page)
@@ -0,0 +1,231 @@
+"""Conversion daemon which keeps a converter and its kernels warm.
+
+The daemon listens on a Unix socket. A request is a JSON line of a command and
+its options. While converting, the daemon sends back the standard output as JSON
+lines, followed by a line of the result. Kernels run in the working directory
+of the client, so they are restarted when a client comes from another one.
+"""
+import json
+import os
+import socket
+import stat
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from pheasant.utils.profile import profiler
+from pheasant.utils.progress import progress_bar_manager
+
+
+def socket_path() -> str:
+    """Return the socket path from PHEASANT_SOCKET or the default one per user.
+
+    The default socket is in `XDG_RUNTIME_DIR`, or in a directory of the user
+    in the temporary directory.
+    """
+    path = os.environ.get("PHEASANT_SOCKET")
+    if path:
+        return path
+    directory = os.environ.get("XDG_RUNTIME_DIR")
+    if not directory:
+        uid = os.getuid() if hasattr(os, "getuid") else 0
+        directory = os.path.join(tempfile.gettempdir(), f"pheasant-{uid}")
+    return os.path.join(directory, "pheasant.sock")
+
+
+def make_private_directory(directory: str) -> None:
+    """Create a directory only the user can access, or check an existing one.
+
+    Raises
+    ------
+    PermissionError
+        If the directory belongs to another user or others can access it.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    status = os.stat(directory)
+    uid = os.getuid() if hasattr(os, "getuid") else status.st_uid
+    if status.st_uid != uid or stat.S_IMODE(status.st_mode) & 0o077:
+        raise PermissionError(f"{directory} must be private to the user.")
+
+
+def peer_uid(connection: socket.socket) -> Optional[int]:
+    """Return the user id of the peer, or None if the platform can't tell."""
+    option = getattr(socket, "SO_PEERCRED", None)
+    if option is None:  # pragma: no cover
+        return None
+    size = struct.calcsize("3i")  # pid, uid and gid.
+    credentials = connection.getsockopt(socket.SOL_SOCKET, option, size)
+    return struct.unpack("3i", credentials)[1]
+
+
+def supported() -> bool:
+    """Return True if the platform supports Unix sockets."""
+    return hasattr(socket, "AF_UNIX")
+
+
+def send(file, message: Dict[str, Any]) -> None:
+    file.write(json.dumps(message).encode("utf-8") + b"\n")
+    file.flush()
+
+
+def request(
+    message: Dict[str, Any], path: str = ""
+) -> Optional[Iterator[Dict[str, Any]]]:
+    """Send a request to the daemon and return an iterator of the responses.
+
+    Parameters
+    ----------
+    message
+        Request which has a `command` key.
+    path
+        Socket path. If empty, `socket_path()` is used.
+
+    Returns
+    -------
+    Iterator of the responses, or None if no daemon is running.
+    """
+    if not supported():
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # type: ignore
+    try:
+        client.connect(path or socket_path())
+    except OSError:
+        client.close()
+        return None
+    file = client.makefile("rwb")
+    send(file, message)
+
+    def responses() -> Iterator[Dict[str, Any]]:
+        try:
+            for line in file:
+                yield json.loads(line)
+        finally:
+            file.close()
+            client.close()
+
+    return responses()
+
+
+def convert_to_files(converter, paths: Iterable[str]) -> None:
+    """Convert source files and write the outputs to `*.out.md` files."""
+    for path, chunks in converter.iter_convert_from_files(paths):
+        path = path.replace(".py", ".md").replace(".md", ".out.md")
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+
+class Stream:
+    """Writable stream which sends the text to a client."""
+
+    def __init__(self, file, tty: bool = False):
+        self.file = file
+        self.tty = tty  # True if the client writes to a terminal.
+
+    def write(self, text: str) -> int:
+        if text:
+            send(self.file, {"type": "stdout", "text": text})
+        return len(text)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def isatty(self) -> bool:
+        return self.tty
+
+
+class Daemon:
+    def __init__(self, path: str = ""):
+        from pheasant.core.pheasant import Pheasant
+
+        self.path = path or socket_path()
+        self.converter = Pheasant()
+
+    def serve(self) -> None:
+        """Serve requests one by one until a `stop` command.
+
+        Only the user who runs the daemon can connect to the socket, and requests
+        from other users are refused.
+        """
+        if "PHEASANT_SOCKET" not in os.environ:
+            make_private_directory(os.path.dirname(self.path))
+        responses = request({"command": "ping"}, self.path)
+        if responses is not None:
+            list(responses)
+            raise RuntimeError(f"A daemon is already running on {self.path}.")
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Left by a daemon which didn't exit cleanly.
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # type: ignore
+        server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        server.listen(1)
+        try:
+            while True:
+                connection, _ = server.accept()
+                with connection, connection.makefile("rwb") as file:
+                    try:
+                        if not self.handle(file, peer_uid(connection)):
+                            break
+                    except OSError:  # pragma: no cover
+                        continue  # The client has gone.
+        finally:
+            server.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def handle(self, file, uid: Optional[int] = None) -> bool:
+        """Handle a request. Return False to stop the daemon.
+
+        Parameters
+        ----------
+        file
+            Stream of the connection.
+        uid
+            User id of the client. A request of another user is refused.
+        """
+        if uid is not None and hasattr(os, "getuid") and uid != os.getuid():
+            send(file, {"type": "error", "message": "Permission denied."})
+            return True
+        message = json.loads(file.readline())
+        command = message.get("command")
+        if command == "stop":
+            send(file, {"type": "done", "info": "Daemon stopped."})
+            return False
+        try:
+            stream = Stream(file, message.get("tty", False))
+            with progress_bar_manager.redirect(stream):
+                info = self.execute(command, message)
+        except Exception as e:
+            send(file, {"type": "error", "message": f"{e.__class__.__name__}: {e}"})
+        else:
+            send(file, {"type": "done", "info": info})
+        return True
+
+    def execute(self, command: str, message: Dict[str, Any]) -> str:
+        """Execute a command with the warm converter and return the log."""
+        if command == "ping":
+            return "pong"
+        converter = self.converter
+        cwd = message.get("cwd", "")
+        if cwd and cwd != os.getcwd():  # Kernels run in the directory of the client.
+            converter.jupyter.kernels.shutdown()
+            os.chdir(cwd)
+        paths = message.get("paths", [])
+        if message.get("force"):
+            for path in paths:
+                converter.pages.pop(path, None)
+        converter.restart = message.get("restart", False)
+        converter.shutdown = message.get("shutdown", False)
+        converter.workers = message.get("workers", 1)
+        converter.spares = message.get("spares", 0)
+        converter.jupyter.set_config(verbose=message.get("verbose", 0))
+        converter.header.set_config(index=message.get("index", ""))
+        if command not in ["run", "convert"]:
+            raise ValueError(f"Unknown command: {command}")
+        with profiler.profile(message.get("profile", "")):
+            if command == "run":
+                converter.convert_from_files(paths)
+            else:
+                convert_to_files(converter, paths)
+        return converter.log.info
@@ -0,0 +1,185 @@
+"""Garbage collection of the page caches in `.pheasant_cache` directories."""
+import fnmatch
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+
+from pheasant.core.page import IGNORE
+
+CACHE_DIRECTORY = ".pheasant_cache"
+TEMPORARY_AGE = 3600  # Seconds until a temporary file is regarded as leftover.
+
+
+@dataclass
+class CacheFile:
+    path: str
+    source: str  # Page path of the cache. Empty for a leftover temporary file.
+    size: int
+    atime: float  # Last loaded time.
+
+    @property
+    def orphan(self) -> bool:
+        return not self.source or not os.path.exists(self.source)
+
+
+@dataclass
+class CacheManager:
+    paths: List[str]
+    ignore: Iterable[str] = ()  # Globs of names skipped in addition to `IGNORE`.
+    caches: List[CacheFile] = field(default_factory=list, init=False)
+
+    def __post_init__(self):
+        if not self.paths:
+            self.paths = ["."]
+
+    def collect(self) -> List[CacheFile]:
+        """Collect the page caches in the cache directories under the paths."""
+        ignored = [*IGNORE, *self.ignore]
+        pattern = re.compile("|".join(fnmatch.translate(glob) for glob in ignored))
+        self.caches = []
+        stack = [path for path in self.paths if os.path.isdir(path)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            directories = []
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):  # Links may be outside.
+                    continue
+                if entry.name == CACHE_DIRECTORY:
+                    self.caches.extend(scan(entry.path))
+                elif not pattern.match(entry.name):
+                    directories.append(entry.path)
+            stack.extend(reversed(directories))
+        return self.caches
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number and the size of the caches and the orphans."""
+        orphans = [cache for cache in self.caches if cache.orphan]
+        return {
+            "count": len(self.caches),
+            "size": sum(cache.size for cache in self.caches),
+            "orphans": len(orphans),
+            "orphan_size": sum(cache.size for cache in orphans),
+            "oldest": min((cache.atime for cache in self.caches), default=0.0),
+        }
+
+    def select(self, max_size: int = 0, max_age: float = 0) -> List[CacheFile]:
+        """Select the caches to be deleted.
+
+        Orphans are always selected. Then the caches not loaded for `max_age`
+        days, and the least recently loaded ones until the rest fits `max_size`.
+
+        Parameters
+        ----------
+        max_size
+            Size budget of the caches in bytes. 0 for no limit.
+        max_age
+            Days since a cache was loaded last. 0 for no limit.
+        """
+        caches = sorted(self.caches, key=lambda cache: cache.atime)
+        deadline = time.time() - max_age * 86400 if max_age else 0
+        expired = [cache.orphan or cache.atime < deadline for cache in caches]
+        selected = [cache for cache, old in zip(caches, expired) if old]
+        size = sum(cache.size for cache, old in zip(caches, expired) if not old)
+        for cache, old in zip(caches, expired):
+            if not max_size or size <= max_size:
+                break
+            if not old:
+                selected.append(cache)
+                size -= cache.size
+        return selected
+
+    def gc(
+        self, max_size: int = 0, max_age: float = 0, dry_run: bool = False
+    ) -> List[CacheFile]:
+        """Delete the caches selected by `select` and return them.
+
+        Cache directories left empty are removed. See `select` for the
+        parameters. If `dry_run` is True, nothing is deleted.
+        """
+        selected = self.select(max_size, max_age)
+        if dry_run:
+            return selected
+        directories = set()
+        for cache in selected:
+            try:
+                os.remove(cache.path)
+            except OSError:
+                continue
+            directories.add(os.path.dirname(cache.path))
+        for directory in directories:
+            try:
+                os.rmdir(directory)
+            except OSError:  # Not empty.
+                pass
+        paths = {cache.path for cache in selected}
+        self.caches = [cache for cache in self.caches if cache.path not in paths]
+        return selected
+
+
+def scan(directory: str) -> List[CacheFile]:
+    """Return the page caches and leftover temporary files in a cache directory.
+
+    A temporary file modified in `TEMPORARY_AGE` seconds is skipped, because a
+    running conversion may be writing it.
+    """
+    root = os.path.dirname(directory)
+    caches = []
+    deadline = time.time() - TEMPORARY_AGE
+    with os.scandir(directory) as it:
+        for entry in it:
+            name = entry.name
+            if name.endswith(".cache"):
+                source = os.path.join(root, name[: -len(".cache")])
+            elif name.endswith(".cache.tmp"):
+                source = ""
+            else:
+                continue
+            stat = entry.stat()
+            if not source and stat.st_mtime > deadline:
+                continue
+            caches.append(CacheFile(entry.path, source, stat.st_size, stat.st_atime))
+    return caches
+
+
+UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(size: str) -> int:
+    """Parse a size with an optional unit into bytes.
+
+    Examples
+    --------
+    >>> parse_size("512")
+    512
+    >>> parse_size("1.5K")
+    1536
+    >>> parse_size("2 GB")
+    2147483648
+    """
+    match = re.match(r"^\s*([0-9.]+)\s*([KMGT]?)B?\s*$", size.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    return int(float(match.group(1)) * UNITS[match.group(2)])
+
+
+def format_size(size: float) -> str:
+    """Format a size in bytes.
+
+    Examples
+    --------
+    >>> format_size(512)
+    '512B'
+    >>> format_size(1536)
+    '1.5KB'
+    """
+    for unit in ["", "K", "M", "G", "T"]:
+        if size < 1024 or unit == "T":
+            break
+        size /= 1024
+    return f"{size:.0f}B" if not unit else f"{size:.1f}{unit}B"
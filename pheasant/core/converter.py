@@ -3,17 +3,19 @@ import os
 from collections import OrderedDict
 from contextlib import contextmanager
 from dataclasses import field
-from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Set, Tuple)
 
 from pheasant.core.base import Base
-from pheasant.core.page import Page
+from pheasant.core.page import Page, get_mtime
 from pheasant.core.parser import Parser
 from pheasant.core.renderer import Renderer
+from pheasant.utils.profile import profiler
 from pheasant.utils.time import format_timedelta_human
 
 
 class Log:
-    pass
+    info: str = ""
 
 
 class Converter(Base):
@@ -23,6 +25,7 @@ class Converter(Base):
     postprocesses: Dict[str, Callable[[str], str]] = field(default_factory=dict)
     pages: Dict[str, Page] = field(default_factory=dict)
     dirty: bool = True
+    spill: str = ""  # Directory to spill page sources to. Empty to keep in memory.
     log: Log = field(default_factory=Log, init=False)
 
     def __post_init__(self):
@@ -62,6 +65,36 @@ class Converter(Base):
             renderer.start()
         if not self.dirty:
             self.pages.clear()
+        else:  # Check all the pages before any page is converted again.
+            for path in [path for path in self.pages if self.modified(path)]:
+                self.pages.pop(path)
+
+    def modified(self, path: str, seen: Optional[Set[str]] = None) -> bool:
+        """Return True if a page has to be converted again.
+
+        A page is modified if the source file or one of its dependencies has
+        been changed since the conversion. Dependencies which are pages are
+        checked recursively.
+
+        Parameters
+        ----------
+        path
+            The source path of a page.
+        """
+        if path not in self.pages:
+            return True
+        seen = set() if seen is None else seen
+        seen.add(path)
+        page = self.pages[path]
+        if page.st_mtime != get_mtime(path):
+            return True
+        for depend, st_mtime in page.depends.items():
+            if st_mtime != get_mtime(depend):
+                return True
+            if depend in self.pages and depend not in seen:
+                if self.modified(depend, seen):
+                    return True
+        return False
 
     def register(
         self,
@@ -121,28 +154,58 @@ class Converter(Base):
         -------
         Converted output text.
         """
+        source = "".join(self.iter_convert_by_name(path, name))
+        self.pages[path].source = source
+        if self.spill:
+            self.pages[path].spill(self.spill)
+        return source
+
+    def iter_convert_by_name(self, path: str, name: str) -> Iterator[str]:
+        """Convert a source file with a named parser and yield the output in chunks.
+
+        Unlike `convert_by_name`, the output is not stored in the page source.
+        If the parser has a postprocess, the output is yielded as one chunk.
+        If the caller stops iterating or the parse fails, the renderers abort
+        instead of exit, so that they don't commit the state of a partial page.
+
+        Parameters
+        ----------
+        path
+            The source path to be converted.
+        name
+            Parser name to be used.
+        """
         if path not in self.pages:
             self.pages[path] = Page(path)
             self.pages[path].read()
 
         page = self.pages[path]
 
-        for renderer in self.renderers[name]:
-            renderer.page = page
-            renderer.enter()
-
-        source = page.source
-        if name in self.preprocesses:
-            source = self.preprocesses[name](source)
-        source = self.parse(source, name)
-        if name in self.postprocesses:
-            source = self.postprocesses[name](source)
-        page.source = source
-
-        for renderer in self.renderers[name]:
-            renderer.exit()
+        with profiler.timer(path, "stages", name):
+            for renderer in self.renderers[name]:
+                renderer.page = page
+                renderer.enter()
+
+        try:
+            with profiler.timer(path, "stages", name):
+                source = page.source
+                if name in self.preprocesses:
+                    source = self.preprocesses[name](source)
+            chunks = self.parsers[name].iter_parse(source)
+            if profiler.enabled:
+                chunks = profiler.iterate(chunks, path, "stages", name)
+            if name in self.postprocesses:
+                yield self.postprocesses[name]("".join(chunks))
+            else:
+                yield from chunks
+        except BaseException:  # Including GeneratorExit of an early close.
+            for renderer in self.renderers[name]:
+                renderer.abort()
+            raise
 
-        return page.source
+        with profiler.timer(path, "stages", name):
+            for renderer in self.renderers[name]:
+                renderer.exit()
 
     def _convert(self, path: str) -> str:
         """Convert a source file with sequntial parsers.
@@ -171,7 +234,7 @@ class Converter(Base):
         Converted output text.
         """
         if self.dirty and path in self.pages:
-            if self.pages[path].st_mtime == os.stat(path).st_mtime:
+            if not self.modified(path):
                 return self.pages[path].source
             else:
                 self.pages.pop(path)
@@ -180,6 +243,19 @@ class Converter(Base):
         self.pages[path].st_mtime = os.stat(path).st_mtime
         return output
 
+    def iter_convert(self, path: str) -> Iterator[str]:
+        """Convert a source file and yield the output in chunks.
+
+        The output is not kept in `pages`.
+
+        Parameters
+        ----------
+        path
+            The source path to be converted.
+        """
+        self.pages.pop(path, None)
+        yield from self.iter_convert_by_name(path, "default")
+
     def _convert_from_files(self, paths: Iterable[str]) -> List[str]:
         return ["Not implemented" for path in paths]
 
@@ -187,6 +263,28 @@ class Converter(Base):
         with elapsed_time(self.log):
             return self._convert_from_files(paths)
 
+    def build_from_files(self, paths: Iterable[str]) -> None:
+        """Convert source files and keep the outputs only in `pages`.
+
+        Unlike `convert_from_files`, the outputs are not collected in a list, so
+        that spilled page sources stay out of memory.
+        """
+        with elapsed_time(self.log):
+            self._build_from_files(paths)
+
+    def _build_from_files(self, paths: Iterable[str]) -> None:
+        self._convert_from_files(paths)
+
+    def iter_convert_from_files(
+        self, paths: Iterable[str]
+    ) -> Iterator[Tuple[str, Iterator[str]]]:
+        """Yield a tuple of (path, output chunks) for each source file.
+
+        Each iterator of output chunks has to be consumed before the next one.
+        """
+        for path in paths:
+            yield path, self.iter_convert(path)
+
 
 @contextmanager
 def elapsed_time(log):
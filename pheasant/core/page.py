@@ -1,8 +1,39 @@
+import fnmatch
+import hashlib
 import io
+import json
 import os
-import pickle
+import re
+import struct
+import time
+import zlib
 from dataclasses import dataclass, field
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CACHE_MAGIC = b"PHEASANT-CACHE\n"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct(">HBI")  # version, flags, length of index
+COMPRESSED = 1
+
+
+def get_mtime(path: str) -> float:
+    """Return the modification time of a file, or 0 if the file doesn't exist."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def touch(path: str) -> None:
+    """Set the access time of a file to now, keeping the modification time.
+
+    The access time of a cache tells the least recently used one, even on file
+    systems mounted with `noatime`.
+    """
+    try:
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+    except OSError:
+        pass
 
 
 def cache_path(path: str) -> str:
@@ -13,48 +44,205 @@ def cache_path(path: str) -> str:
 @dataclass
 class Cache:
     page_path: str = field(default="", init=False)
+    # (mtime, size) scanned by `Pages.collect`. (0, 0) if the file doesn't exist.
+    scanned: Optional[Tuple[float, float]] = field(default=None, init=False)
 
     @property
     def path(self) -> str:
         return cache_path(self.page_path)
 
+    @property
+    def mtime(self) -> float:
+        if self.scanned:
+            return self.scanned[0]
+        return get_mtime(self.path)
+
     @property
     def size(self) -> float:
+        if self.scanned:
+            return self.scanned[1]
         if os.path.exists(self.path):
             return os.path.getsize(self.path)
         else:
             return 0.0
 
-    def save(self, obj: Any) -> str:
+    def save(
+        self,
+        items: Iterable[Dict[str, Any]],
+        meta: Optional[Dict[str, Any]] = None,
+        index: Iterable[str] = (),
+        compress: bool = True,
+    ) -> str:
+        """Save items to the cache file.
+
+        The file consists of a header, an index and payloads. The index holds
+        `meta` and the fields of each item listed in `index`. The other fields of
+        an item are stored in a payload which is loaded only when accessed.
+
+        Parameters
+        ----------
+        items
+            JSON serializable dictionaries.
+        meta
+            JSON serializable dictionary for the whole page.
+        index
+            Field names stored in the index.
+        compress
+            If True, payloads are compressed by zlib.
+        """
+        keys = set(index)
+        entries = []
+        payloads = []
+        offset = 0
+        for item in items:
+            fields = {key: value for key, value in item.items() if key not in keys}
+            payload = json.dumps(fields).encode("utf-8")
+            if compress:
+                payload = zlib.compress(payload)
+            payloads.append(payload)
+            item_index = {key: value for key, value in item.items() if key in keys}
+            entries.append(
+                {"index": item_index, "offset": offset, "size": len(payload)}
+            )
+            offset += len(payload)
+        header = json.dumps({"meta": meta or {}, "items": entries}).encode("utf-8")
+        flags = COMPRESSED if compress else 0
+
         directory = os.path.dirname(self.path)
         if not os.path.exists(directory):
             os.mkdir(directory)
-        with open(self.path, "wb") as f:
-            pickle.dump(obj, f)
+        path = self.path + ".tmp"
+        with open(path, "wb") as f:
+            f.write(CACHE_MAGIC)
+            f.write(CACHE_HEADER.pack(CACHE_VERSION, flags, len(header)))
+            f.write(header)
+            for payload in payloads:
+                f.write(payload)
+        os.replace(path, self.path)
+        self.scanned = None
         return self.path
 
-    def load(self) -> Any:
-        if os.path.exists(self.path):
-            with open(self.path, "rb") as f:
-                return pickle.load(f)
-        return None
+    def load(self) -> Optional[Tuple[List["CacheItem"], Dict[str, Any]]]:
+        """Load the index of the cache file and return a tuple of (items, meta).
+
+        Returns None if the cache doesn't exist or was written by other version.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            try:
+                version, flags, length = CACHE_HEADER.unpack(f.read(CACHE_HEADER.size))
+            except struct.error:
+                return None
+            if version != CACHE_VERSION:
+                return None
+            header = json.loads(f.read(length).decode("utf-8"))
+        touch(self.path)
+        start = len(CACHE_MAGIC) + CACHE_HEADER.size + length
+        compressed = bool(flags & COMPRESSED)
+        items = [
+            CacheItem(
+                self.path,
+                entry["index"],
+                start + entry["offset"],
+                entry["size"],
+                compressed,
+            )
+            for entry in header["items"]
+        ]
+        return items, header["meta"]
 
     def delete(self) -> None:
         if os.path.exists(self.path):
             os.remove(self.path)
+        self.scanned = None
+
+
+@dataclass
+class CacheItem:
+    """Item in a cache file. Its payload is read when the first time accessed."""
+
+    path: str
+    index: Dict[str, Any]
+    offset: int
+    size: int
+    compressed: bool
+    payload: Optional[Dict[str, Any]] = field(default=None, init=False)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.index:
+            return self.index[key]
+        return self.load()[key]
+
+    def load(self) -> Dict[str, Any]:
+        """Return the whole fields of the item."""
+        if self.payload is None:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(self.size)
+            if self.compressed:
+                data = zlib.decompress(data)
+            self.payload = json.loads(data.decode("utf-8"))
+        return dict(self.payload, **self.index)
 
 
 @dataclass
 class Page:
     path: str = ""
-    source: str = field(default="", init=False)
+    _source: str = field(default="", init=False, repr=False)
+    spilled: str = field(default="", init=False)  # File the source is spilled to.
     st_mtime: float = field(default=0.0, init=False)
     meta: Dict[str, Any] = field(default_factory=dict, init=False)
     cache: Cache = field(default_factory=Cache, init=False)
+    depends: Dict[str, float] = field(default_factory=dict, init=False)
+    scanned: Optional[float] = field(default=None, init=False)  # By Pages.collect.
 
     def __post_init__(self):
         self.cache.page_path = self.path
 
+    @property
+    def source(self) -> str:
+        if not self.spilled:
+            return self._source
+        with io.open(self.spilled, "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    @source.setter
+    def source(self, source: str) -> None:
+        self._source = source
+        self.spilled = ""
+
+    def spill(self, directory: str) -> None:
+        """Write the source to a file and release it from memory.
+
+        The `source` property reads the file each time accessed.
+
+        Parameters
+        ----------
+        directory
+            Directory to write the file. The file name is unique for the path.
+        """
+        name = hashlib.sha1(self.path.encode("utf-8")).hexdigest() + ".md"
+        path = os.path.join(directory, name)
+        os.makedirs(directory, exist_ok=True)
+        with io.open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(self._source)
+        self._source = ""
+        self.spilled = path
+
+    def depend(self, path: str) -> None:
+        """Record a file which the output depends on with its modification time.
+
+        Parameters
+        ----------
+        path
+            An embedded file or a page which defines a referenced tag.
+        """
+        if path and path != self.path:
+            self.depends[path] = get_mtime(path)
+
     def read(self) -> str:
         with io.open(self.path, "r", encoding="utf-8-sig", errors="strict") as f:
             self.source = f.read()
@@ -62,14 +250,17 @@ class Page:
 
     @property
     def has_cache(self) -> bool:
+        if self.cache.scanned:
+            return self.cache.scanned[0] > 0
         return os.path.exists(self.cache.path)
 
     @property
     def modified(self) -> bool:
         if not self.has_cache:
             return True
-        else:
-            return os.stat(self.path).st_mtime > os.stat(self.cache.path).st_mtime
+        if self.scanned is None:
+            return os.stat(self.path).st_mtime > self.cache.mtime
+        return self.scanned > self.cache.mtime
 
     def to_dict(self) -> Dict[str, Any]:
         return dict(
@@ -80,10 +271,14 @@ class Page:
         )
 
 
+IGNORE = (".*", "__pycache__", "node_modules")
+
+
 @dataclass
 class Pages:
     paths: List[str]
     ext: str
+    ignore: Iterable[str] = ()  # Globs of names skipped in addition to `IGNORE`.
     _pages: List[Page] = field(default_factory=list, init=False)
 
     def __post_init__(self):
@@ -91,21 +286,20 @@ class Pages:
             self.paths = ["."]
 
     def collect(self) -> List[Page]:
-        exts = self.ext.split(",")
-        self._pages = []
-
-        def collect(path):
-            if os.path.splitext(path)[-1][1:] in exts:
-                self._pages.append(Page(os.path.normpath(path)))
+        """Collect pages in the paths.
 
+        Directories are scanned once each, including their cache directories, so
+        that `Page.has_cache` and `Page.modified` don't touch the file system.
+        Entries matching an ignore glob are skipped, but given paths never.
+        """
+        exts = {"." + ext for ext in self.ext.split(",")}
+        ignore = [*IGNORE, *self.ignore]
+        self._pages = []
         for path in self.paths:
             if os.path.isdir(path):
-                for dirpath, dirnames, filenames in os.walk(path):
-                    for file in filenames:
-                        collect(os.path.join(dirpath, file))
-            else:
-                collect(path)
-
+                self._pages.extend(scan(os.path.normpath(path), exts, ignore))
+            elif os.path.splitext(path)[1] in exts:
+                self._pages.append(Page(os.path.normpath(path)))
         return self._pages
 
     def __getitem__(self, index):
@@ -116,3 +310,51 @@ class Pages:
 
     def to_list(self) -> List:
         return [page.to_dict() for page in self._pages]
+
+
+def scan(directory: str, exts: Iterable[str], ignore: Iterable[str]) -> List[Page]:
+    """Return pages in a directory recursively, in the order of names.
+
+    Parameters
+    ----------
+    directory
+        Directory to scan.
+    exts
+        Extensions of pages with a leading dot.
+    ignore
+        Globs of file and directory names to skip.
+    """
+    exts = tuple(exts)
+    ignored = re.compile("|".join(fnmatch.translate(glob) for glob in ignore))
+    pages = []
+    stack = [directory]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        caches: Dict[str, os.DirEntry] = {}
+        for entry in entries:
+            if entry.name == ".pheasant_cache" and entry.is_dir():
+                with os.scandir(entry.path) as it:
+                    caches = {cache.name: cache for cache in it}
+        directories = []
+        for entry in entries:
+            name = entry.name
+            if ignored.match(name):
+                continue
+            if entry.is_dir(follow_symlinks=False):  # Links may make a cycle.
+                directories.append(entry.path)
+            elif name.endswith(exts):
+                page = Page(entry.path)
+                cache = caches.get(name + ".cache")
+                if cache is None:  # Modified anyway. No need to stat the page.
+                    page.cache.scanned = (0.0, 0.0)
+                else:
+                    stat = cache.stat()
+                    page.cache.scanned = (stat.st_mtime, stat.st_size)
+                    page.scanned = entry.stat().st_mtime
+                pages.append(page)
+        stack.extend(reversed(directories))
+    return pages
@@ -1,11 +1,13 @@
 import re
 from collections import OrderedDict
 from dataclasses import field
-from typing import Any, Callable, Dict, List, Match, Optional, Pattern, Union
+from typing import (Any, Callable, Dict, Iterator, List, Match, Optional,
+                    Pattern, Tuple, Union)
 
 from pheasant.core.base import (Base, Cell, Render, Splitter, get_render_name,
                                 make_cell_class, rename_pattern)
 from pheasant.core.decorator import Decorator
+from pheasant.utils.profile import profiler
 
 
 class Parser(Base):
@@ -13,6 +15,9 @@ class Parser(Base):
     renders: Dict[str, Render] = field(default_factory=OrderedDict, init=False)
     cell_classes: Dict[str, type] = field(default_factory=dict, init=False)
     pattern: Optional[Pattern] = field(default=None, init=False)
+    dispatch: Dict[int, Tuple[str, List[Tuple[str, int]]]] = field(
+        default_factory=dict, init=False
+    )
     decorator: Optional[Decorator] = field(default=None, init=False)
 
     def __post_repr__(self):
@@ -45,21 +50,38 @@ class Parser(Base):
         str
             Rendered and decorated output text.
         """
-        splitter = self.split(source)
+        return "".join(self.iter_parse(source, decorate))
 
-        def iterator():
-            for cell in splitter:
-                if cell.match:
-                    cell.output = cell.parse(splitter, self)
-                else:
-                    cell.output = cell.source
-                if callable(decorate):
-                    decorate(cell)
-                elif decorate is True and self.decorator:
-                    self.decorator.decorate(cell)
-                yield cell.output
+    def iter_parse(
+        self, source: str, decorate: Union[Callable, bool] = True
+    ) -> Iterator[str]:
+        """Parse the source and yield the rendered and decorated output of each cell.
 
-        return "".join(iterator())
+        See `parse` for the parameters.
+        """
+        splitter = self.split(source)
+        for cell in splitter:
+            if cell.match:
+                cell.output = self.parse_cell(cell, splitter)
+            else:
+                cell.output = cell.source
+            if callable(decorate):
+                decorate(cell)
+            elif decorate is True and self.decorator:
+                self.decorator.decorate(cell)
+            yield cell.output
+
+    def parse_cell(self, cell: Any, splitter: Splitter) -> str:
+        if not profiler.enabled:
+            return cell.parse(splitter, self)
+        render = self.renders[cell.render_name]
+        renderer = getattr(render, "__self__", None)
+        if renderer is None or not hasattr(renderer, "page"):
+            path, name = "", cell.render_name
+        else:
+            path, name = renderer.page.path, renderer.name
+        with profiler.renderer(path, name):
+            return cell.parse(splitter, self)
 
     def parse_from_cell(self, cell: Any, splitter: Splitter, decorate=True) -> str:
         cell.output = cell.parse(splitter, self)
@@ -71,6 +93,17 @@ class Parser(Base):
         self.pattern = re.compile(
             "|".join(self.patterns.values()), re.MULTILINE | re.DOTALL
         )
+        self.dispatch.clear()
+        groupindex = self.pattern.groupindex
+        for render_name in self.patterns:
+            prefix = render_name + "___"
+            fields = [
+                (name[len(prefix) :], index)
+                for name, index in groupindex.items()
+                if name.startswith(prefix)
+            ]
+            fields.sort(key=lambda x: x[1])
+            self.dispatch[groupindex[render_name]] = (render_name, fields)
 
     def split(self, source: str) -> Splitter:
         """Split the source into a cell and yield it.
@@ -115,23 +148,14 @@ class Parser(Base):
         -------
         cell : Cell dataclass instance
         """
-        groupdict = match.groupdict()
-        render_name = ""
-
-        def rename_for_render(key):
-            nonlocal render_name
-            if "___" in key:
-                return key.split("___")[-1]
-            else:
-                render_name = key
-                return "_source"
-
-        context = {
-            rename_for_render(key): value
-            for key, value in groupdict.items()
-            if value is not None
-        }
-        source = context["_source"]
+        # The outermost group of a render pattern is closed at last.
+        render_name, fields = self.dispatch[match.lastindex]  # type: ignore
+        source = match.group(match.lastindex)  # type: ignore
+        context = {"_source": source}
+        for name, index in fields:
+            value = match.group(index)
+            if value is not None:
+                context[name] = value
         return self.cell_classes[render_name](source, match, "", context)
 
     def findall(self, source: str) -> List:
@@ -1,11 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import field
-from typing import Dict, Iterable, List
+from queue import Empty, Queue
+from typing import Dict, Iterable, Iterator, List, Tuple
 
-from pheasant.core.converter import Converter, Page
+from pheasant.core.converter import Converter, Page, elapsed_time
 from pheasant.core.decorator import Decorator
 from pheasant.renderers.embed.embed import Embed
 from pheasant.renderers.jupyter.jupyter import CacheMismatchError, Jupyter
-from pheasant.renderers.jupyter.kernel import kernels
+from pheasant.renderers.jupyter.kernel import Kernels
 from pheasant.renderers.number.number import Anchor, Header
 from pheasant.renderers.script.script import Script
 
@@ -21,6 +23,8 @@ class Pheasant(Converter):
     shutdown: bool = False
     restart: bool = False
     verbose: int = 0  # 0: no info, 1: output, 2: code and output
+    workers: int = 1  # Number of pages executed concurrently.
+    spares: int = 0  # Number of warm kernels kept for restart and shutdown.
 
     def init(self):
         self.anchor.header = self.header
@@ -54,23 +58,103 @@ class Pheasant(Converter):
         except NameError:
             return self.convert_by_name(path, "main")
 
+    def iter_convert(self, path: str) -> Iterator[str]:
+        """Convert a source file and yield the output of 'link' parser in chunks.
+
+        The output of 'main' parser is kept in `pages`.
+
+        Parameters
+        ----------
+        path
+            The source path to be converted.
+        """
+        self.convert(path)
+        yield from self.iter_convert_by_name(path, "link")
+
     def _convert_from_files(self, paths: Iterable[str]) -> List[str]:
-        self.start()
         paths = list(paths)
+        self._build_from_files(paths)
+        return [self.pages[path].source for path in paths]
+
+    def _build_from_files(self, paths: Iterable[str]) -> None:
+        paths = list(paths)
+        self.convert_main_from_files(paths)
+        for path in paths:
+            self.convert_by_name(path, "link")
+
+    def iter_convert_from_files(
+        self, paths: Iterable[str]
+    ) -> Iterator[Tuple[str, Iterator[str]]]:
+        """Yield a tuple of (path, output chunks) for each source file.
+
+        All the files are converted by 'main' parser first, then the output of
+        'link' parser is streamed. Each iterator of output chunks has to be
+        consumed before the next one.
+        """
+        paths = list(paths)
+        with elapsed_time(self.log):
+            self.convert_main_from_files(paths)
+        for path in paths:
+            yield path, self.iter_convert_by_name(path, "link")
+
+    def convert_main_from_files(self, paths: List[str]) -> None:
+        self.start()
+        if self.workers > 1:
+            self.execute_from_files(paths)
+        self.jupyter.kernels.spares = self.spares
         self.jupyter.progress_bar.multi = len(paths)
         for k, path in enumerate(paths):
             self.jupyter.progress_bar.step = k + 1
             self.convert(path)
 
             if self.shutdown:
-                kernels.shutdown()
+                self.jupyter.kernels.shutdown(keep_spares=k < len(paths) - 1)
             elif self.restart:
-                kernels.restart()
+                self.jupyter.kernels.restart()
+
+    def execute_from_files(self, paths: Iterable[str]) -> None:
+        """Execute modified pages concurrently to fill the Jupyter caches.
 
+        Each worker has its own converter and its own kernels, so that pages
+        don't share a kernel namespace. Numbering and linking are left to the
+        sequential conversion, which is then served from the caches.
+
+        Parameters
+        ----------
+        paths
+            The source paths to be executed.
+        """
+        queue: Queue = Queue()
         for path in paths:
-            self.convert_by_name(path, "link")
+            if Page(path).modified:
+                queue.put(path)
+        workers = min(self.workers, queue.qsize())
+        if workers < 2:
+            return
 
-        return [self.pages[path].source for path in paths]
+        def work():
+            converter = Pheasant(restart=self.restart or self.shutdown)
+            converter.jupyter.kernels = Kernels(spares=self.spares)
+            for name in ["header", "jupyter", "embed"]:
+                getattr(converter, name).config.update(getattr(self, name).config)
+            converter.jupyter.set_config(verbose=0, progress=False)
+            converter.header.set_config(index="")  # Numbered by the sequential one.
+            try:
+                while True:
+                    try:
+                        path = queue.get_nowait()
+                    except Empty:
+                        break
+                    converter.convert(path)
+                    if converter.restart:
+                        converter.jupyter.kernels.restart()
+            finally:
+                converter.jupyter.kernels.shutdown()
+
+        with ThreadPoolExecutor(workers) as executor:
+            futures = [executor.submit(work) for _ in range(workers)]
+        for future in futures:
+            future.result()
 
 
 def preprocess(source: str) -> str:
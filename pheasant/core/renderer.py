@@ -1,13 +1,16 @@
 import importlib
 import os
+import threading
 from dataclasses import field
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import (Environment, FileSystemBytecodeCache, FileSystemLoader,
+                    select_autoescape)
 
 from pheasant.core.base import Base, get_render_name
 from pheasant.core.page import Page
 from pheasant.core.parser import Parser, Render  # Render is type, not class
+from pheasant.utils.profile import profiler
 
 
 class Renderer(Base):
@@ -41,6 +44,10 @@ class Renderer(Base):
         """Called at page exit event"""
         pass
 
+    def abort(self) -> None:
+        """Called instead of exit if the page conversion stops halfway"""
+        pass
+
     def register(self, pattern: str, render: Render, render_name: str = "") -> None:
         if not render_name:
             render_name = get_render_name(render)
@@ -75,9 +82,8 @@ class Renderer(Base):
 
     def set_template(self, names: Union[str, List[str]], directory: str = ".") -> List:
         module = importlib.import_module(self.__module__)
-        default = os.path.join(os.path.dirname(module.__file__), "templates")
-        loader = FileSystemLoader([directory, default])
-        env = Environment(loader=loader, autoescape=select_autoescape(["jinja2"]))
+        default = os.path.join(os.path.dirname(module.__file__ or ""), "templates")
+        env = get_environment([directory, default])
         names = [names] if isinstance(names, str) else names
         templates = []
         for name in names:
@@ -93,7 +99,8 @@ class Renderer(Base):
 
     def render(self, name: str, context: Dict[str, Any], **kwargs) -> str:
         template = self.config[f"{name}_template"]
-        return template.render(context, config=self.config, **kwargs)
+        with profiler.timer(self.page.path, "timers", "template"):
+            return template.render(context, config=self.config, **kwargs)
 
     def parse(self, source: str = "") -> str:
         return self.parser.parse(source or self.page.source, decorate=self.decorate)
@@ -110,3 +117,59 @@ class Renderer(Base):
             self.configure_parser(self.class_parser)
 
         return self.class_parser.findall(source or self.page.source)
+
+
+class BytecodeCache(FileSystemBytecodeCache):
+    def dump_bytecode(self, bucket) -> None:
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:  # The cache directory has been deleted.
+            pass
+
+
+ENVIRONMENTS: Dict[Tuple[str, ...], Environment] = {}
+ENVIRONMENT_LOCK = threading.Lock()
+bytecode_cache: Optional[BytecodeCache] = None
+
+
+def get_environment(searchpath: List[str]) -> Environment:
+    """Return a template environment shared in the process.
+
+    Environments are keyed by the absolute search path of the loader, so that
+    renderers of new converters reuse the templates compiled before.
+
+    Parameters
+    ----------
+    searchpath
+        Directories to search templates in.
+    """
+    key = tuple(os.path.abspath(path) for path in searchpath)
+    with ENVIRONMENT_LOCK:
+        if key not in ENVIRONMENTS:
+            loader = FileSystemLoader(list(key))
+            env = Environment(loader=loader, autoescape=select_autoescape(["jinja2"]))
+            env.bytecode_cache = bytecode_cache
+            ENVIRONMENTS[key] = env
+        return ENVIRONMENTS[key]
+
+
+def set_bytecode_cache(directory: str = "") -> None:
+    """Store compiled templates in a directory to load them in later processes.
+
+    Parameters
+    ----------
+    directory
+        Cache directory. If empty, `templates` in the user cache directory,
+        `$XDG_CACHE_HOME/pheasant` or `~/.cache/pheasant`.
+    """
+    global bytecode_cache
+
+    if not directory:
+        root = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        directory = os.path.join(root, "pheasant", "templates")
+    directory = os.path.abspath(directory)
+    os.makedirs(directory, exist_ok=True)
+    with ENVIRONMENT_LOCK:
+        bytecode_cache = BytecodeCache(directory)
+        for env in ENVIRONMENTS.values():
+            env.bytecode_cache = bytecode_cache
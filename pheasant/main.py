@@ -5,6 +5,7 @@ import click
 
 from pheasant import __version__
 from pheasant.core.page import Pages
+from pheasant.utils.profile import profiler
 
 pgk_dir = os.path.dirname(os.path.abspath(__file__))
 version_msg = f"{__version__} from {pgk_dir} (Python {sys.version[:3]})."
@@ -25,12 +26,83 @@ ext_option = click.option(
     show_default=True,
     help="File extension(s) separated by commas.",
 )
+ignore_option = click.option(
+    "--ignore",
+    multiple=True,
+    help="Glob of file or directory names to skip. Can be repeated.",
+)
 max_option = click.option(
     "--max", default=100, show_default=True, help="Maximum number of files."
 )
+jobs_option = click.option(
+    "-j", "--jobs", default=1, show_default=True, help="Number of parallel pages."
+)
+spares_option = click.option(
+    "--spares",
+    default=0,
+    show_default=True,
+    help="Number of warm kernels for restart and shutdown.",
+)
+local_option = click.option(
+    "--local", is_flag=True, help="Convert in this process even if a daemon runs."
+)
+profile_option = click.option(
+    "--profile",
+    default="",
+    type=click.Path(dir_okay=False),
+    help="Write a timing report to a JSON file.",
+)
 paths_argument = click.argument("paths", nargs=-1, type=click.Path(exists=True))
 
 
+def tag_index(pages) -> str:
+    """Return the path of the tag index of pages.
+
+    The nearest index in the common directory of the pages or its parents is
+    used, so that converting a part of the pages shares the index of the whole.
+    If none is found, the index is made in the working directory, or in the
+    common directory if the pages are outside the working directory.
+    """
+    cwd = os.getcwd()
+    directories = [os.path.dirname(os.path.abspath(page.path)) for page in pages]
+    root = os.path.commonpath(directories) if directories else cwd
+    directory = root
+    while True:
+        path = os.path.join(directory, ".pheasant_cache", "tags.db")
+        if os.path.exists(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    if os.path.commonpath([cwd, root]) == cwd:
+        root = cwd
+    return os.path.join(root, ".pheasant_cache", "tags.db")
+
+
+def submit(command, pages, **options) -> bool:
+    """Submit a command to the daemon. Return False if no daemon is running."""
+    from pheasant.app.daemon import request
+
+    paths = [os.path.abspath(page.path) for page in pages]
+    index = tag_index(pages)
+    cwd, tty = os.getcwd(), sys.stdout.isatty()
+    message = dict(command=command, paths=paths, index=index, cwd=cwd, tty=tty)
+    message.update(options)
+    responses = request(message)
+    if responses is None:
+        return False
+    for response in responses:
+        if response["type"] == "stdout":
+            click.echo(response["text"], nl=False)
+        elif response["type"] == "error":
+            click.secho(response["message"], fg="red")
+            sys.exit(1)
+        else:
+            click.secho(response["info"], bold=True)
+    return True
+
+
 @cli.command(help="Run source files and save the caches.")
 @click.option("-r", "--restart", is_flag=True, help="Restart kernel after run.")
 @click.option("-s", "--shutdown", is_flag=True, help="Shutdown kernel after run.")
@@ -38,11 +110,29 @@ paths_argument = click.argument("paths", nargs=-1, type=click.Path(exists=True))
 @click.option(
     "-v", "--verbose", count=True, help="Print input codes and/or outputs from kernel."
 )
+@jobs_option
+@spares_option
 @ext_option
+@ignore_option
+@local_option
+@profile_option
 @max_option
 @paths_argument
-def run(paths, ext, max, restart, shutdown, force, verbose):
-    pages = Pages(paths, ext).collect()
+def run(
+    paths,
+    ext,
+    ignore,
+    max,
+    restart,
+    shutdown,
+    force,
+    verbose,
+    jobs,
+    spares,
+    local,
+    profile,
+):
+    pages = Pages(paths, ext, ignore).collect()
 
     length = len(pages)
     click.secho(f"collected {length} files.", bold=True)
@@ -57,11 +147,29 @@ def run(paths, ext, max, restart, shutdown, force, verbose):
                 page.cache.delete()
                 click.echo(page.cache.path + " was deleted.")
 
+    options = dict(restart=restart, shutdown=shutdown, verbose=verbose)
+    profile = os.path.abspath(profile) if profile else ""
+    if not local and submit(
+        "run",
+        pages,
+        workers=jobs,
+        spares=spares,
+        profile=profile,
+        force=force,
+        **options,
+    ):
+        return
+
     from pheasant.core.pheasant import Pheasant
+    from pheasant.core.renderer import set_bytecode_cache
+
+    set_bytecode_cache()
 
-    converter = Pheasant(restart=restart, shutdown=shutdown, verbose=verbose)
+    converter = Pheasant(workers=jobs, spares=spares, **options)
     converter.jupyter.safe = True
-    converter.convert_from_files(page.path for page in pages)
+    converter.header.set_config(index=tag_index(pages))
+    with profiler.profile(profile):
+        converter.convert_from_files(page.path for page in pages)
     click.secho(f"{converter.log.info}", bold=True)
 
 
@@ -72,11 +180,29 @@ def run(paths, ext, max, restart, shutdown, force, verbose):
 @click.option(
     "-v", "--verbose", count=True, help="Print input codes and/or outputs from kernel."
 )
+@jobs_option
+@spares_option
 @ext_option
+@ignore_option
+@local_option
+@profile_option
 @max_option
 @paths_argument
-def convert(paths, ext, max, restart, shutdown, force, verbose):
-    pages = Pages(paths, ext).collect()
+def convert(
+    paths,
+    ext,
+    ignore,
+    max,
+    restart,
+    shutdown,
+    force,
+    verbose,
+    jobs,
+    spares,
+    local,
+    profile,
+):
+    pages = Pages(paths, ext, ignore).collect()
 
     length = len(pages)
     click.secho(f"collected {length} files.", bold=True)
@@ -91,22 +217,38 @@ def convert(paths, ext, max, restart, shutdown, force, verbose):
                 page.cache.delete()
                 click.echo(page.cache.path + " was deleted.")
 
+    options = dict(restart=restart, shutdown=shutdown, verbose=verbose)
+    profile = os.path.abspath(profile) if profile else ""
+    if not local and submit(
+        "convert",
+        pages,
+        workers=jobs,
+        spares=spares,
+        profile=profile,
+        force=force,
+        **options,
+    ):
+        return
+
+    from pheasant.app.daemon import convert_to_files
     from pheasant.core.pheasant import Pheasant
+    from pheasant.core.renderer import set_bytecode_cache
 
-    converter = Pheasant(restart=restart, shutdown=shutdown, verbose=verbose)
+    set_bytecode_cache()
+
+    converter = Pheasant(workers=jobs, spares=spares, **options)
     converter.jupyter.safe = True
-    outputs = converter.convert_from_files(page.path for page in pages)
-    for page, output in zip(pages, outputs):
-        path = page.path.replace(".py", ".md").replace(".md", ".out.md")
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(output)
+    converter.header.set_config(index=tag_index(pages))
+    with profiler.profile(profile):
+        convert_to_files(converter, (page.path for page in pages))
 
 
 @cli.command(help="List source files.")
 @ext_option
+@ignore_option
 @paths_argument
-def list(paths, ext):
-    pages = Pages(paths, ext).collect()
+def list(paths, ext, ignore):
+    pages = Pages(paths, ext, ignore).collect()
 
     def size(cache):
         size = cache.size / 1024
@@ -129,9 +271,10 @@ def list(paths, ext):
 @cli.command(help="Delete caches for source files.")
 @click.option("-y", "--yes", is_flag=True, help="Do not ask for confirmation.")
 @ext_option
+@ignore_option
 @paths_argument
-def clean(paths, ext, yes):
-    pages = Pages(paths, ext).collect()
+def clean(paths, ext, ignore, yes):
+    pages = Pages(paths, ext, ignore).collect()
     caches = [page.cache for page in pages if page.has_cache]
 
     if not caches:
@@ -153,6 +296,76 @@ def clean(paths, ext, yes):
         click.echo(cache.path + " was deleted.")
 
 
+@cli.group(help="Inspect and prune the caches of source files.")
+def cache():
+    pass
+
+
+@cache.command(help="Show the number and the size of caches.")
+@ignore_option
+@paths_argument
+def stats(paths, ignore):
+    from pheasant.core.cache import CacheManager, format_size
+
+    manager = CacheManager(paths, ignore)
+    manager.collect()
+    stats = manager.stats()
+    click.echo(f"caches: {stats['count']} ({format_size(stats['size'])})")
+    click.echo(f"orphans: {stats['orphans']} ({format_size(stats['orphan_size'])})")
+
+
+def size_callback(ctx, param, value) -> int:
+    from pheasant.core.cache import parse_size
+
+    try:
+        return parse_size(value) if value else 0
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+@cache.command(help="Delete orphan, old and least recently used caches.")
+@click.option(
+    "--max-size", default="", callback=size_callback, help="Size budget, e.g. 500MB."
+)
+@click.option("--max-age", default=0.0, help="Days since a cache was used last.")
+@click.option("-n", "--dry-run", is_flag=True, help="Only show caches to delete.")
+@ignore_option
+@paths_argument
+def gc(paths, ignore, max_size, max_age, dry_run):
+    from pheasant.core.cache import CacheManager, format_size
+
+    manager = CacheManager(paths, ignore)
+    manager.collect()
+    deleted = manager.gc(max_size, max_age, dry_run)
+    for cache in deleted:
+        click.echo(cache.path + (" will be deleted." if dry_run else " was deleted."))
+    size = format_size(sum(cache.size for cache in deleted))
+    freed = "would be freed" if dry_run else "freed"
+    click.secho(f"{len(deleted)} caches, {size} {freed}.", bold=True)
+
+
+@cli.command(help="Run a daemon which keeps a converter and kernels warm.")
+@click.option("--stop", is_flag=True, help="Stop the running daemon.")
+def daemon(stop):
+    from pheasant.app.daemon import Daemon, request, socket_path, supported
+
+    if not supported():  # pragma: no cover
+        click.secho("Daemon is not supported on this platform.", fg="yellow")
+        sys.exit(1)
+
+    if stop:
+        responses = request({"command": "stop"})
+        if responses is None:
+            click.secho("No daemon is running.", bold=True)
+        else:
+            for response in responses:
+                click.secho(response["info"], bold=True)
+        return
+
+    click.secho(f"Listening on {socket_path()}", bold=True)
+    Daemon().serve()
+
+
 @cli.command(help="Python script prompt.")
 def python():
     prompt(script=True)
@@ -190,8 +403,9 @@ def prompt(script=False):
 @click.option("--port", default=8000, show_default=True, help="Port number.")
 @paths_argument
 @ext_option
-def serve(port, paths, ext):
+@ignore_option
+def serve(port, paths, ext, ignore):
     from pheasant.app.app import App
 
-    app = App(paths, ext)
+    app = App(paths, ext, ignore)
     app.run(port=port)
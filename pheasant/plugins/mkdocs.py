@@ -1,18 +1,23 @@
+import atexit
 import importlib
 import io
 import logging
 import os
 import re
-from typing import List
+import shutil
+import tempfile
+from typing import List, Set
 
 import yaml
 from mkdocs.config import config_options
 from mkdocs.plugins import BasePlugin
 from mkdocs.structure.files import get_files
-from mkdocs.utils import markdown_extensions, string_types
+from mkdocs.utils import get_relative_url, markdown_extensions, string_types
 
 import pheasant
 from pheasant.core.pheasant import Pheasant
+from pheasant.renderers.jupyter.ipython import ASSET_URL
+from pheasant.utils.profile import profiler
 
 logger = logging.getLogger("mkdocs")
 
@@ -25,13 +30,41 @@ class PheasantPlugin(BasePlugin):
         ("dirty", config_options.Type(bool, default=True)),
         ("version", config_options.Type(string_types, default="")),
         ("header", config_options.Type(dict, default={})),
+        ("workers", config_options.Type(int, default=1)),
+        ("assets", config_options.Type(bool, default=False)),
+        ("profile", config_options.Type(string_types, default="")),
+        ("prelude", config_options.Type(string_types, default="")),
+        ("fork", config_options.Type(bool, default=False)),
+        ("spill", config_options.Type(bool, default=True)),
+        ("store", config_options.Type(string_types, default="")),
     )
     converter = Pheasant()
     logger.info(f"[Pheasant] Converter created.")
 
+    def __init__(self):
+        super().__init__()
+        self.assets: Set[str] = set()  # Names of the assets referred by the pages.
+
     def on_config(self, config, **kwargs):
-        self.converter.jupyter.set_config(enabled=self.config["jupyter"])
+        self.converter.jupyter.set_config(
+            enabled=self.config["jupyter"],
+            prelude=self.config["prelude"],
+            fork=self.config["fork"],
+        )
+        if self.config["store"]:
+            self.converter.jupyter.set_config(store=self.config["store"])
         self.converter.header.set_config(self.config["header"])
+        index = os.path.join(config["docs_dir"], ".pheasant_cache", "tags.db")
+        self.converter.header.set_config(index=index)
+        self.converter.workers = self.config["workers"]
+        if not self.config["spill"]:
+            self.converter.spill = ""
+        elif not self.converter.spill:  # Kept while serving to reuse the pages.
+            self.converter.spill = tempfile.mkdtemp(prefix="pheasant-pages-")
+            atexit.register(shutil.rmtree, self.converter.spill, True)
+        if self.config["assets"]:
+            assets = os.path.join(config["docs_dir"], ".pheasant_cache", "assets")
+            self.converter.jupyter.set_config(assets=assets)
 
         if self.config["version"]:
             try:
@@ -50,6 +83,9 @@ class PheasantPlugin(BasePlugin):
             config["nav"] = build_nav(config["nav"], config["docs_dir"])
         return config
 
+    def on_pre_build(self, config, **kwargs):
+        self.assets.clear()
+
     def on_files(self, files, config):
         root = os.path.join(os.path.dirname(pheasant.__file__), "theme")
         docs_dir = config["docs_dir"]
@@ -86,8 +122,15 @@ class PheasantPlugin(BasePlugin):
     def on_nav(self, nav, config, **kwargs):
         paths = [page.file.abs_src_path for page in nav.pages]
         logger.info(f"[Pheasant] Converting {len(paths)} pages.")
-        self.converter.convert_from_files(paths)
+        with profiler.profile(self.config["profile"]):
+            self.converter.build_from_files(paths)
+        for path in paths:
+            if self.converter.pages[path].meta.get("failed"):
+                logger.warning(f"[Pheasant] Some cells timed out: {path}")
         logger.info(f"[Pheasant] Conversion finished. {self.converter.log.info}")
+        if self.config["profile"]:
+            for line in profiler.summary():
+                logger.info(f"[Pheasant] {line}")
         return nav
 
     def on_page_read_source(self, source, page, **kwargs):
@@ -99,15 +142,42 @@ class PheasantPlugin(BasePlugin):
     def on_page_content(self, content, page, **kwargs):
         if page.toc.items:
             page.title = page.toc.items[0].title
+        if ASSET_URL in content:
+            content = ASSET_PATTERN.sub(lambda m: self.asset_url(m, page), content)
         if page.file.abs_src_path not in self.converter.pages:
             return content
         else:
             extra = self.converter.pages[page.file.abs_src_path].meta["extra_html"]
             return "\n".join([extra, content])
 
+    def asset_url(self, match, page) -> str:
+        name = match.group(1)
+        self.assets.add(name)
+        return get_relative_url(ASSET_DIR + "/" + name, page.url)
+
     def on_post_page(self, output, **kwargs):  # This is needed for holoviews.
         return output.replace('.js" defer></script>', '.js"></script>')
 
+    def on_post_build(self, config, **kwargs):
+        """Copy the assets referred by the pages into the site directory.
+
+        Missing assets, e.g. of the cells cached before the asset directory was
+        deleted, are skipped with a warning.
+        """
+        if not self.assets:
+            return
+        source = self.converter.jupyter.config["assets"]
+        destination = os.path.join(config["site_dir"], ASSET_DIR)
+        os.makedirs(destination, exist_ok=True)
+        for name in sorted(self.assets):
+            path = os.path.join(destination, name)
+            if os.path.exists(path):
+                continue
+            if not source or not os.path.exists(os.path.join(source, name)):
+                logger.warning(f"[Pheasant] Asset not found: {name}")
+                continue
+            shutil.copyfile(os.path.join(source, name), path)
+
     def on_serve(self, server, **kwargs):  # pragma: no cover
         self.converter.dirty = self.config["dirty"]
         watcher = server.watcher
@@ -115,10 +185,20 @@ class PheasantPlugin(BasePlugin):
         root = os.path.join(os.path.dirname(pheasant.__file__), "theme")
         server.watch(root, builder)
         watcher.ignore_dirs(".pheasant_cache")
+        # Embedded files may be outside of docs_dir.
+        pages = self.converter.pages
+        depends = {path for page in pages.values() for path in page.depends}
+        for path in sorted(depends):
+            if path not in pages and os.path.exists(path):
+                server.watch(path, builder)
 
         return server
 
 
+ASSET_DIR = "assets/pheasant"
+ASSET_PATTERN = re.compile(re.escape(ASSET_URL) + r"([0-9a-f]+\.\w+)")
+
+
 def build_nav(nav: List, docs_dir: str, parent: str = "") -> List:
     del_entries = []
     for index, entry in enumerate(nav):
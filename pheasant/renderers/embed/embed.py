@@ -42,6 +42,7 @@ class Embed(Renderer):
         context.update(resolve_path(context["source"].strip(), self.page.path))
         language = context["language"]
         path = context["abs_src_path"]
+        self.page.depend(path)
         if not os.path.exists(path):
             yield f'<p style="font-color:red">File not found: {path}</p>\n'
             return
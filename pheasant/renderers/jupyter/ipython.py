@@ -1,7 +1,12 @@
 import ast
+import base64
+import functools
+import hashlib
 import json
+import os
 import re
-from typing import Any, Dict, Iterable, List, Tuple
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Tuple
 
 import jinja2
 from IPython import get_ipython
@@ -222,14 +227,120 @@ def register_altair_formatter(formatters):  # pragma: no cover
             formatters["text/html"].for_type(cls, altair_to_html)
 
 
-def register_formatters(latex_printer=None):  # pragma: no cover
+class PostImportFinder:
+    """Meta path finder which calls hooks after a module is imported.
+
+    The finder doesn't find any module by itself. It asks the other finders for
+    the spec of a hooked module and wraps the loader to call the hooks after the
+    module is executed.
+    """
+
+    def __init__(self):
+        self.hooks: Dict[str, List[Callable[[], None]]] = {}
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in self.hooks:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec  # pragma: no cover
+        exec_module = spec.loader.exec_module
+
+        def exec_module_(module):
+            exec_module(module)
+            for hook in self.hooks.pop(fullname, []):
+                hook()
+
+        spec.loader.exec_module = exec_module_
+        return spec
+
+    def register(self, name: str, hook: Callable[[], None]) -> None:
+        """Call the hook after the module is imported, or now if already imported."""
+        if name in sys.modules:
+            hook()
+            return
+        self.hooks.setdefault(name, []).append(hook)
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+
+post_import_finder = PostImportFinder()
+
+
+checkpoint_namespace: Dict[str, Any] = {}
+
+
+def checkpoint() -> None:  # pragma: no cover
+    """Take a snapshot of the user namespace."""
+    checkpoint_namespace.clear()
+    checkpoint_namespace.update(get_ipython().user_ns)
+
+
+def restore() -> None:  # pragma: no cover
+    """Restore the user namespace to the snapshot.
+
+    Names defined after the snapshot are deleted and rebound names are bound to
+    the objects of the snapshot again. Objects are not copied, so that changes
+    made to them in place are kept.
+    """
+    namespace = get_ipython().user_ns
+    for name in list(namespace):
+        if name not in checkpoint_namespace:
+            del namespace[name]
+    namespace.update(checkpoint_namespace)
+
+
+def limit_memory(megabytes: int) -> None:  # pragma: no cover
+    """Limit the address space of the kernel process.
+
+    A cell which exceeds the limit raises MemoryError. Ignored on Windows.
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = megabytes * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def register_formatters(latex_printer=None, lazy=True):  # pragma: no cover
+    """Register formatters for the third party objects.
+
+    Parameters
+    ----------
+    latex_printer
+        Function to print a Sympy's object in latex.
+    lazy
+        If True, a formatter is registered when the module is imported so that
+        the kernel doesn't import the modules which are never used.
+    """
     ip = get_ipython()
     formatters = ip.display_formatter.formatters
-    register_altair_formatter(formatters)
-    register_bokeh_formatter(formatters)
-    register_holoviews_formatter(formatters)
-    register_sympy_formatter(formatters, latex_printer=latex_printer)
-    register_pandas_formatter(formatters)
+    registers = {
+        "altair": register_altair_formatter,
+        "bokeh": register_bokeh_formatter,
+        "holoviews": register_holoviews_formatter,
+        "sympy": functools.partial(
+            register_sympy_formatter, latex_printer=latex_printer
+        ),
+        "pandas": register_pandas_formatter,
+    }
+    for name, register in registers.items():
+        if lazy:
+            hook = functools.partial(register, formatters)
+            post_import_finder.register(name, hook)
+        else:
+            register(formatters)
 
 
 EXTRA_MODULES = ["altair", "bokeh", "holoviews", "sympy"]  # order is important
@@ -309,6 +420,56 @@ def select_display_data(outputs: List[Dict]) -> None:
                 break
 
 
+ASSET_URL = "pheasant-asset://"
+ASSET_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/svg+xml": "svg",
+}
+
+
+def extract_assets(outputs: List[Dict], directory: str) -> None:
+    """Write images to asset files and refer to them by URL.
+
+    An output which has image data gets a `url` field and its data is emptied.
+    The URL starts with `ASSET_URL`, which is replaced by the real location
+    of the asset directory when the page is published.
+
+    Parameters
+    ----------
+    outputs
+        Outputs after `select_display_data`.
+    directory
+        Directory to write the asset files.
+    """
+    for output in outputs:
+        for data_type, data in output.get("data", {}).items():
+            if data_type in ASSET_EXTENSIONS:
+                output["url"] = save_asset(data, data_type, directory)
+                output["data"][data_type] = ""
+
+
+def save_asset(data: str, data_type: str, directory: str) -> str:
+    """Save image data to a file named by its content hash and return the URL.
+
+    The same image is saved only once, even if it is output by different pages.
+    """
+    if data_type == "image/svg+xml":
+        content = data.encode("utf-8")
+    else:
+        content = base64.b64decode(data)
+    digest = hashlib.sha1(content).hexdigest()[:20]
+    name = f"{digest}.{ASSET_EXTENSIONS[data_type]}"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            file.write(content)
+        os.replace(path + ".tmp", path)
+    return ASSET_URL + name
+
+
 def select_last_display_data(outputs: List[Dict]) -> None:
     last = -1
     for k, output in enumerate(outputs):
@@ -1,20 +1,30 @@
+import ast
+import hashlib
 import os
 import re
-from dataclasses import dataclass, field
+import time
+from dataclasses import asdict, dataclass, field, replace
 from itertools import takewhile
-from typing import Dict, Iterator, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+from pheasant.core.base import get_render_name
 from pheasant.core.decorator import commentable, surround
+from pheasant.core.page import CacheItem
 from pheasant.core.renderer import Renderer
 from pheasant.renderers.jupyter.filters import get_metadata
-from pheasant.renderers.jupyter.ipython import (extra_html, get_extra_module,
+from pheasant.renderers.jupyter.ipython import (extra_html, extract_assets,
+                                                get_extra_module,
                                                 latex_display_format,
                                                 select_display_data,
                                                 select_last_display_data,
                                                 select_outputs)
-from pheasant.renderers.jupyter.kernel import (format_report, kernels,
-                                               output_hook)
-from pheasant.utils.progress import ProgressBar, progress_bar_factory
+from pheasant.renderers.jupyter.kernel import (Kernel, Kernels, format_report,
+                                               kernels, output_hook,
+                                               raise_name_error, timeout_output)
+from pheasant.renderers.jupyter.store import STORE_ENV, Store, get_environment
+from pheasant.utils.profile import profiler
+from pheasant.utils.progress import (ProgressBar, progress_bar_factory,
+                                     progress_bar_manager)
 
 
 @dataclass
@@ -22,12 +32,110 @@ class Cell:
     code: str
     context: Dict[str, str]
     template: str
-    valid: bool = field(default=True, init=False)
+    key: str = field(default="", compare=False)
     cached: bool = field(default=False, compare=False)
     output: str = field(default="", compare=False)
     extra_module: str = field(default="", compare=False)
 
 
+@dataclass
+class Dependency:
+    """Hash chain of the cells executed in a page.
+
+    A cell key is a hash of the cell content and the keys of the preceding cells
+    which the cell depends on. For Python, a cell depends on the last cells that
+    referred to the same names, the free names of the functions it calls, and the
+    names which may refer to the same objects. A cell whose names can't be
+    determined depends on all the preceding cells, and all the following cells
+    depend on it.
+    """
+
+    chain: str = ""
+    barrier: str = ""
+    names: Dict[str, str] = field(default_factory=dict)
+    definitions: Dict[str, Set[str]] = field(default_factory=dict)
+    aliases: Dict[str, Set[str]] = field(default_factory=dict)
+    statics: Set[str] = field(default_factory=set)
+
+    def key(self, content: str, names: Optional[Set[str]]) -> str:
+        if names is None:
+            return cell_hash(content, self.chain)
+        names = self.expand(names)
+        states = [
+            f"{name}={self.names[name]}" for name in sorted(names) if name in self.names
+        ]
+        return cell_hash(content, self.barrier, *states)
+
+    def parents(self, names: Optional[Set[str]]) -> Optional[List[str]]:
+        """Return the keys which a cell depends on, or None for all the preceding."""
+        if names is None:
+            return None
+        names = self.expand(names)
+        keys = [self.names[name] for name in sorted(names) if name in self.names]
+        return [self.barrier, *keys] if self.barrier else keys
+
+    def update(
+        self, key: str, names: Optional[Set[str]], bindings: Optional["Bindings"] = None
+    ) -> None:
+        self.chain = cell_hash(self.chain, key)
+        if bindings:
+            self.bind(bindings)
+        if names is None:
+            self.barrier = key
+        else:
+            for name in self.expand(names):
+                self.names[name] = key
+
+    def bind(self, bindings: "Bindings") -> None:
+        self.statics.update(bindings.statics)
+        self.definitions.update(bindings.definitions)
+        for group in bindings.aliases:
+            group = group - self.statics
+            if len(group) < 2:
+                continue
+            merged = group.union(*(self.aliases.get(name, ()) for name in group))
+            for name in merged:
+                self.aliases[name] = merged
+
+    def expand(self, names: Set[str]) -> Set[str]:
+        """Add the free names of the functions and the aliases to names recursively.
+
+        Examples
+        --------
+        >>> dependency = Dependency(definitions={"f": {"g"}}, aliases={"a": {"a", "b"}})
+        >>> sorted(dependency.expand({"f", "a"}))
+        ['a', 'b', 'f', 'g']
+        """
+        expanded: Set[str] = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in expanded:
+                continue
+            expanded.add(name)
+            stack.extend(self.definitions.get(name, ()))
+            stack.extend(self.aliases.get(name, ()))
+        return expanded
+
+    def copy(self) -> "Dependency":
+        return replace(
+            self,
+            names=dict(self.names),
+            definitions=dict(self.definitions),
+            aliases=dict(self.aliases),
+            statics=set(self.statics),
+        )
+
+
+@dataclass
+class Bindings:
+    """Names bound by a cell which the following cells depend on indirectly."""
+
+    definitions: Dict[str, Set[str]] = field(default_factory=dict)  # Free names.
+    aliases: List[Set[str]] = field(default_factory=list)
+    statics: Set[str] = field(default_factory=set)  # Modules, functions and classes.
+
+
 class CacheMismatchError(BaseException):
     """Raised if the cache doesn't match input code in safe mode."""
 
@@ -36,14 +144,28 @@ class Jupyter(Renderer):
     language: str = "python"
     count: int = field(default=0, init=False)
     cache: List[Cell] = field(default_factory=list, init=False)
+    cached_cells: Dict[str, CacheItem] = field(default_factory=dict, init=False)
+    previous: List[CacheItem] = field(default_factory=list, init=False)
+    dependency: Dependency = field(default_factory=Dependency, init=False)
     extra_html: str = field(default="", init=False)
+    prefetched: Dict[str, List[Tuple[List, Dict[str, Any]]]] = field(
+        default_factory=dict, init=False
+    )
+    kernels: Kernels = field(default_factory=lambda: kernels, init=False)
+    deadline: float = field(default=0.0, init=False)
+    restored: Set[str] = field(default_factory=set, init=False)
+    store: Optional[Store] = field(default=None, init=False)
+    pending: Dict[str, Tuple[str, Optional[List[str]]]] = field(
+        default_factory=dict, init=False
+    )
     progress_bar: ProgressBar = field(default_factory=progress_bar_factory, init=False)
 
     FENCED_CODE_PATTERN = (
         r"^(?P<mark>`{3,})(?P<language>\w*) ?(?P<option>.*?)\n"
         r"(?P<code>.*?)\n(?P=mark)\n"
     )
-    INLINE_CODE_PATTERN = r"\{\{(?P<code>.+?)\}\}"
+    # The empty `next` group tells whether another inline code follows.
+    INLINE_CODE_PATTERN = r"\{\{(?P<code>.+?)\}\}(?P<next>(?=[^{]*\{\{.+?\}\}))?"
     RE_INLINE_CODE_PATTERN = re.compile(INLINE_CODE_PATTERN)
 
     def init(self):
@@ -53,12 +175,53 @@ class Jupyter(Renderer):
         templates[0].environment.filters["get_metadata"] = get_metadata
         # safe: If True, code must match cache.
         # verbose: 0: no info, 1: output, 2: code and output
-        self.set_config(enabled=True, safe=False, verbose=0)
+        # progress: If False, no progress bar is displayed. It is not displayed
+        #   either unless the output is a terminal.
+        # compress: If True, cached outputs are compressed.
+        # batch: If True, consecutive inline codes are executed at once.
+        # assets: Directory to write images. If empty, images are inlined.
+        # timeout: Seconds a cell can run. 0 for no limit. Option `timeout=<sec>`.
+        # page_timeout: Seconds the cells of a page can run. 0 for no limit.
+        # memory: Memory limit of a kernel process in MB. 0 for no limit.
+        # prelude: Python code run once in a kernel. Each page starts from the
+        #   namespace checkpoint taken after the prelude.
+        # fork: If True, python kernels are forked from a zygote process which
+        #   has run the prelude, so that they share its modules copy-on-write.
+        # store: Root directory of a cell store shared across checkouts. Cells are
+        #   addressed by their keys and the kernel environment. Defaults to the
+        #   `PHEASANT_STORE` environment variable. Empty for no store.
+        self.set_config(
+            enabled=True,
+            safe=False,
+            verbose=0,
+            progress=True,
+            compress=True,
+            batch=True,
+            assets="",
+            timeout=0,
+            page_timeout=0,
+            memory=0,
+            prelude="",
+            fork=False,
+            store=os.environ.get(STORE_ENV, ""),
+        )
 
     def enter(self):
         self.count = 0
-        self.progress_bar.total = len(self.findall())
-        self.cache, self.extra_html = self.page.cache.load() or ([], "")
+        with profiler.timer(self.page.path, "timers", "cache_load"):
+            self.previous, meta = self.page.cache.load() or ([], {})
+        self.progress_bar.total = self.get_total(meta)
+        self.extra_html = meta.get("extra_html", "")
+        self.cached_cells = {item["key"]: item for item in self.previous}
+        self.cache = []
+        prelude = cell_hash(self.config["prelude"]) if self.config["prelude"] else ""
+        self.dependency = Dependency(chain=prelude, barrier=prelude)
+        self.prefetched = {}
+        self.restored = set()
+        self.pending = {}
+        page_timeout = self.config["page_timeout"]
+        self.deadline = time.monotonic() + page_timeout if page_timeout else 0.0
+        self.page.meta.pop("failed", None)
 
     def exit(self):
         self.progress_bar.finish(count=self.count)
@@ -70,7 +233,35 @@ class Jupyter(Renderer):
         if self.config["enabled"] and self.page.path and self.cache:
             for cell in self.cache:
                 cell.cached = True
-            self.page.cache.save((self.cache, self.extra_html))
+            with profiler.timer(self.page.path, "timers", "cache_save"):
+                self.page.cache.save(
+                    [asdict(cell) for cell in self.cache],
+                    {"extra_html": self.extra_html, "count": self.count},
+                    index=["key", "extra_module"],
+                    compress=self.config["compress"],
+                )
+        self.previous, self.cached_cells = [], {}  # Released until the next page.
+        self.pending = {}
+
+    def abort(self):
+        """Release the page without saving the cache of a partial page."""
+        self.progress_bar.finish(done=False)
+        self.cache = []
+        self.previous, self.cached_cells = [], {}
+        self.pending, self.prefetched = {}, {}
+
+    def get_total(self, meta: Dict[str, Any]) -> int:
+        """Return the number of cells for the progress bar, or 0 for no progress bar.
+
+        The number of the previous run is taken from the cache, so that the page
+        is scanned before the parse only if it has no cache. Without a terminal,
+        the page is never scanned.
+        """
+        if not self.config["progress"] or not progress_bar_manager.isatty():
+            return 0
+        if "count" in meta:
+            return meta["count"]
+        return len(self.findall())
 
     def get_extra_modules(self) -> Iterator[str]:
         for cell in self.cache:
@@ -97,37 +288,125 @@ class Jupyter(Renderer):
 
     @commentable("code")
     def render_inline_code(self, context, splitter, parser) -> Iterator[str]:
-        code, context["option"] = split_option(context["code"])
+        followed = context.pop("next", None) is not None
+        code, context["option"] = split_inline_code(context["code"])
         if "inspect" in context["option"]:
             source = f"\n```python inspect hide-input\n{code}\n```\n"
             splitter.send(source)
             return
-        elif "fenced-code" not in context["option"]:
-            code = code.replace(";", "\n")
+        if followed and self.config["batch"]:
+            self.prefetch(code, context["option"], splitter)
         yield self.execute_and_render(code, context, "inline_code")
 
+    def prefetch(self, code: str, option: str, splitter) -> None:
+        """Execute a run of consecutive inline codes in one kernel request.
+
+        The following cells are taken from the splitter and sent back as they
+        were. Results of the codes are stored in `prefetched` by cell key, and
+        `execute_and_render` uses them instead of executing the code again. The
+        batch ends before a cached code and stops at the first failed code, and
+        the codes following it are executed one by one later.
+        """
+        if not self.config["enabled"] or (self.config["safe"] and self.previous):
+            return
+        kernel_name = self.kernels.get_kernel_name(self.language)
+        if not kernel_name:
+            return
+        dependency = self.dependency.copy()
+
+        def speculate(code: str, option: str) -> Tuple[str, Optional[List[str]]]:
+            content = self.get_content("inline_code", code, option)
+            names = get_names(code, self.language)
+            key = dependency.key(content, names)
+            parents = dependency.parents(names)
+            dependency.update(key, names, get_bindings(code, self.language))
+            return key, parents
+
+        first, parents = speculate(code, option)
+        if not is_batchable(option) or first in self.cached_cells:
+            return
+        if self.stored(first):
+            return
+        if self.prefetched.get(first):
+            return
+
+        codes = [(code, option)]
+        cells = []
+        while True:
+            cell = next(splitter)
+            cells.append(cell)
+            if cell.match is None:  # Another cell follows the text.
+                continue
+            if cell.render_name != get_render_name(self.render_inline_code):
+                break
+            context = cell.context
+            if context["code"].startswith("#"):
+                break
+            codes.append(split_inline_code(context["code"]))
+            if context.get("next") is None:
+                break
+        splitter.send("".join(cell.source for cell in cells))
+
+        keys, batch = [first], [code]
+        for code, option in codes[1:]:
+            if not is_batchable(option):
+                break
+            key, parents_ = speculate(code, option)
+            # Cached codes are executed later if a following cell needs them.
+            if key in self.cached_cells or self.stored(key):
+                break
+            keys.append(key)
+            batch.append(code)
+            if parents is not None:
+                parents = None if parents_ is None else parents + parents_
+        if len(batch) < 2:
+            return
+
+        timeout = self.get_timeout(0)
+        if timeout < 0:
+            return
+        kernel = self.get_kernel(kernel_name)
+        self.replay(kernel, parents)  # The pending cells which the batch needs.
+        hook = output_hook if self.config["verbose"] else None
+        with profiler.timer(self.page.path, "timers", "kernel"):
+            results = kernel.execute_many(batch, hook, timeout, stop_on_error=True)
+        for key, result in zip(keys, results):
+            self.prefetched.setdefault(key, []).append(result)
+
     def execute_and_render(self, code, context, template) -> str:
+        with profiler.cell(self.page.path, count=self.count + 1):
+            return self._execute_and_render(code, context, template)
+
+    def _execute_and_render(self, code, context, template) -> str:
         self.count += 1
+        self.language = context.get("language", self.language)
 
         cell = Cell(code, context, template)
-        if len(self.cache) >= self.count:
-            cached = self.cache[self.count - 1]
-            if "freeze" in context["option"] or cell == cached:
-                if self.page.path and (self.count - 1) % 5 == 0:
-                    relpath = os.path.relpath(self.page.path)
-                    self.progress_bar.progress(relpath, count=self.count)
-                return surround(cached.output, "cached")
-            elif self.page.path and self.config["safe"]:
-                self.page.cache.delete()
-                self.progress_bar.finish(done=False)
-                raise CacheMismatchError
+        content = self.get_content(template, code, context["option"])
+        names = get_names(code, self.language)
+        cell.key = self.dependency.key(content, names)
+        parents = self.dependency.parents(names)
+        self.dependency.update(cell.key, names, get_bindings(code, self.language))
+
+        cached = self.get_cached_cell(cell) or self.get_stored_cell(cell)
+        if cached:
+            if "inspect" not in context["option"]:  # Executed later if needed.
+                self.pending[cell.key] = (code, parents)
+            if self.page.path and (self.count - 1) % 5 == 0:
+                relpath = os.path.relpath(self.page.path)
+                self.progress_bar.progress(relpath, count=self.count)
+            self.cache.append(cached)
+            return surround(cached.output, "cached")
+        elif self.page.path and self.config["safe"] and self.previous:
+            self.page.cache.delete()
+            self.progress_bar.finish(done=False)
+            raise CacheMismatchError
 
         if not self.config["enabled"]:
             report = {"count": self.count}
             return self.render(template, context, outputs=[], report=report)
 
-        self.language = context.get("language", self.language)
-        kernel_name = kernels.get_kernel_name(self.language)
+        kernel_name = self.kernels.get_kernel_name(self.language)
 
         if not kernel_name:
             report = {"count": self.count}
@@ -135,15 +414,17 @@ class Jupyter(Renderer):
             self.update_cache(cell)
             return cell.output
 
-        kernel = kernels.get_kernel(kernel_name)
-        kernel.start(silent=self.page.path == "")
+        kernel = self.get_kernel(kernel_name)
+        self.replay(kernel, parents)
 
         if self.count == 1:
             self.progress_bar.progress("Start", count=self.count)
 
+        option, timeout = split_timeout(context["option"])
+        timeout = self.get_timeout(timeout)
         kwargs = ""
         if self.language == "python":
-            _, kwargs = split_kwargs_from_option(context["option"])
+            _, kwargs = split_kwargs_from_option(option)
             if kwargs:
                 kernel.execute(
                     "from pheasant.renderers.jupyter.ipython import formatter_kwargs\n"
@@ -157,20 +438,32 @@ class Jupyter(Renderer):
                 codes = [self.language + "> " + line for line in code.split("\n")]
                 print("\n".join(codes))
             func = kernel.inspect if "inspect" in context["option"] else kernel.execute
-            try:
-                outputs = func(code, output_hook=output_hook if verbose else None)
-            except NameError:
-                if self.page.path:
-                    self.page.cache.delete()
-                    self.progress_bar.finish(done=False)
-                raise NameError(f"Cell number: {self.count}\n{context['code']}")
-            report = format_report(kernel.report)
+            prefetched = self.prefetched.get(cell.key)
+            if timeout < 0 and not prefetched:
+                outputs = [timeout_output(self.config["page_timeout"], "Page")]
+                kernel_report = kernel.report
+            else:
+                try:
+                    if prefetched:
+                        outputs, kernel_report = prefetched.pop(0)
+                        raise_name_error(outputs)
+                    else:
+                        with profiler.timer(self.page.path, "timers", "kernel"):
+                            hook = output_hook if verbose else None
+                            outputs = func(code, output_hook=hook, timeout=timeout)
+                        kernel_report = kernel.report
+                except NameError:
+                    if self.page.path:
+                        self.page.cache.delete()
+                        self.progress_bar.finish(done=False)
+                    raise NameError(f"Cell number: {self.count}\n{context['code']}")
+            report = format_report(kernel_report)
             report["count"] = self.count
             return outputs, report
 
         def format(result):
             relpath = os.path.relpath(self.page.path)
-            return f"{relpath}({result[1]['total']})"
+            return f"{relpath}({result[1].get('total', '')})"
 
         outputs, report = self.progress_bar.progress(execute, format, self.count)
 
@@ -180,8 +473,11 @@ class Jupyter(Renderer):
                 "formatter_kwargs.clear()"
             )
 
+        timed_out = any(output.get("timeout") for output in outputs)
         cell.extra_module = get_extra_module(outputs)
         select_display_data(outputs)
+        if self.config["assets"]:
+            extract_assets(outputs, self.config["assets"])
 
         if "debug" in context["option"]:
             outputs = [{"type": "execute_result", "data": {"text/plain": outputs}}]
@@ -207,18 +503,268 @@ class Jupyter(Renderer):
             outputs=outputs,
             report=report,
         )
-        self.update_cache(cell)
+        if timed_out:  # Not cached to be executed again.
+            self.page.meta["failed"] = True
+        else:
+            self.update_cache(cell)
+            self.put_stored_cell(cell, kernel_name)
         return cell.output
 
-    def update_cache(self, cell: Cell) -> None:
-        if len(self.cache) == self.count - 1:
-            self.cache.append(cell)
+    def get_content(self, template: str, code: str, option: str) -> str:
+        """Return the hash of a cell content which its key is made of.
+
+        The asset directory is a part of it, because the outputs of a cell refer
+        to the asset files only if the directory is set.
+        """
+        args = [template, self.language, code, option]
+        if self.config["assets"]:
+            args.append(self.config["assets"])
+        return cell_hash(*args)
+
+    def get_kernel(self, kernel_name: str) -> Kernel:
+        self.kernels.memory = self.config["memory"]
+        self.kernels.fork = self.config["fork"]
+        self.kernels.preload = self.config["prelude"]
+        kernel = self.kernels.get_kernel(kernel_name)
+        silent = self.page.path == "" or not self.progress_bar.total
+        kernel.start(silent=silent)
+        if self.config["prelude"] and kernel_name not in self.restored:
+            self.restore(kernel)
+            self.restored.add(kernel_name)
+        return kernel
+
+    def restore(self, kernel: Kernel) -> None:
+        """Restore the namespace checkpoint of a kernel.
+
+        If the kernel has no checkpoint of the current prelude, the prelude is
+        executed and a checkpoint is taken instead.
+        """
+        if kernel.language != "python":
             return
+        module = "pheasant.renderers.jupyter.ipython"
+        prelude = self.config["prelude"]
+        if kernel.checkpoint == prelude:
+            kernel.execute(f"from {module} import restore\nrestore()")
+            return
+        for output in kernel.execute(prelude):
+            if output["type"] == "error":
+                error = f"{output['ename']}: {output['evalue']}"
+                raise RuntimeError(f"Prelude failed. {error}")
+        kernel.execute(f"from {module} import checkpoint\ncheckpoint()")
+        kernel.checkpoint = prelude
+
+    def get_timeout(self, timeout: float) -> float:
+        """Return the timeout of a cell in seconds limited by the page timeout.
+
+        Returns 0 for no limit, or -1 if the page has already timed out.
+        """
+        timeout = timeout or self.config["timeout"]
+        if not self.deadline:
+            return timeout
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            return -1
+        return min(timeout, remaining) if timeout else remaining
+
+    def get_cached_cell(self, cell: Cell) -> Optional[Cell]:
+        if "freeze" in cell.context["option"] and len(self.previous) >= self.count:
+            item: Optional[CacheItem] = self.previous[self.count - 1]
+        else:
+            item = self.cached_cells.get(cell.key)
+        return Cell(**item.load()) if item else None
 
-        self.cache[self.count - 1] = cell
-        if len(self.cache) > self.count:
-            if "freeze" not in cell.context["option"]:
-                self.cache[self.count].valid = False
+    def update_cache(self, cell: Cell) -> None:
+        self.cache.append(cell)
+
+    def get_store(self) -> Optional[Store]:
+        root = self.config["store"]
+        if not root:
+            return None
+        if self.store is None or self.store.root != root:
+            self.store = Store(root)
+        return self.store
+
+    def get_address(self, key: str) -> str:
+        """Return the address of a cell in the store, or "" if not available."""
+        store = self.get_store()
+        if not store or not self.config["enabled"]:
+            return ""
+        kernel_name = self.kernels.get_kernel_name(self.language)
+        if not kernel_name:
+            return ""
+        return store.address(key, get_environment(kernel_name))
+
+    def stored(self, key: str) -> bool:
+        address = self.get_address(key)
+        return bool(address) and address in self.store  # type:ignore
+
+    def get_stored_cell(self, cell: Cell) -> Optional[Cell]:
+        """Return a cell from the store, or None if not found."""
+        address = self.get_address(cell.key)
+        item = self.store.get(address) if address else None  # type:ignore
+        if item is None:
+            return None
+        # Not marked as cached, so that the extra html of the page is built.
+        return replace(Cell(**item), cached=False)
+
+    def put_stored_cell(self, cell: Cell, kernel_name: str) -> None:
+        address = self.get_address(cell.key) if kernel_name else ""
+        if address:
+            self.store.put(address, asdict(cell))  # type:ignore
+
+    def replay(self, kernel: Kernel, parents: Optional[List[str]]) -> None:
+        """Execute the pending cells which a cell depends on directly or indirectly.
+
+        The code of a cell served from the cache or the store is kept in `pending`,
+        so that the kernel state is rebuilt only if a following cell which depends
+        on it has to be executed.
+
+        Parameters
+        ----------
+        kernel
+            Kernel to execute the cells.
+        parents
+            Keys of the cells which the cell depends on. None for all the
+            preceding cells.
+        """
+        keys = list(self.pending)
+        required: Set[str] = set()
+        stack = list(keys if parents is None else parents)
+        while stack:
+            key = stack.pop()
+            if key not in self.pending or key in required:
+                continue
+            required.add(key)
+            code, parents_ = self.pending[key]
+            stack.extend(keys[: keys.index(key)] if parents_ is None else parents_)
+        for key in keys:
+            if key in required:
+                code, _ = self.pending.pop(key)
+                with profiler.timer(self.page.path, "timers", "kernel"):
+                    kernel.execute(code)
+
+
+def cell_hash(*args: str) -> str:
+    return hashlib.sha1("\0".join(args).encode("utf-8")).hexdigest()
+
+
+OPAQUE_NAMES = {
+    "_",
+    "__",
+    "___",
+    "In",
+    "Out",
+    "eval",
+    "exec",
+    "get_ipython",
+    "globals",
+    "locals",
+    "vars",
+}
+
+
+def get_names(code: str, language: str) -> Optional[Set[str]]:
+    """Return names which a code refers to, or None if they can't be determined.
+
+    Examples
+    --------
+    >>> sorted(get_names("import numpy as np\\nx = np.sqrt(y)", "python"))
+    ['np', 'x', 'y']
+    >>> get_names("%matplotlib inline", "python") is None
+    True
+    """
+    if language != "python":
+        return None
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    names = set(iter_names(ast.walk(tree)))
+    if "*" in names or names & OPAQUE_NAMES:
+        return None
+    return names
+
+
+DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def get_bindings(code: str, language: str) -> Optional[Bindings]:
+    """Return the functions, the classes, the modules and the aliases a code binds.
+
+    Examples
+    --------
+    >>> bindings = get_bindings("def f(x):\\n    return g(x)\\nb = a[0]", "python")
+    >>> sorted(bindings.definitions["f"])
+    ['g', 'x']
+    >>> [sorted(group) for group in bindings.aliases]
+    [['a', 'b']]
+    """
+    if language != "python":
+        return None
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    bindings = Bindings()
+    for node in ast.walk(tree):
+        if isinstance(node, DEFINITIONS):
+            free = set(iter_names(ast.walk(node))) - {node.name}
+            bindings.definitions[node.name] = free
+            bindings.statics.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            bindings.statics.update(iter_names(node.names))
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Lambda):
+            free = set(iter_names(ast.walk(node.value)))
+            for name in iter_names(ast.walk(ast.Tuple(node.targets, ast.Store()))):
+                bindings.definitions[name] = free
+                bindings.statics.add(name)
+        else:
+            group = set(iter_alias_names(get_alias_nodes(node)))
+            if len(group) > 1:
+                bindings.aliases.append(group)
+    return bindings
+
+
+NAMED_EXPR = getattr(ast, "NamedExpr", ())  # Python 3.8+
+
+
+def get_alias_nodes(node: ast.AST) -> List[ast.AST]:
+    """Return the nodes whose names may refer to the same object after the node."""
+    if isinstance(node, ast.Assign):
+        return [*node.targets, node.value]
+    if isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+        return [node.target, node.value] if node.value else []
+    if isinstance(node, (ast.For, ast.AsyncFor, ast.comprehension)):
+        return [node.target, node.iter]
+    if isinstance(node, ast.withitem):
+        return [node.context_expr, node.optional_vars] if node.optional_vars else []
+    if isinstance(node, NAMED_EXPR):
+        return [node.target, node.value]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        return [node.func.value, *node.args, *node.keywords]  # Such as `x.append(y)`.
+    return []
+
+
+def iter_alias_names(nodes: Iterable[ast.AST]) -> Iterator[str]:
+    """Yield names in nodes except the names of called functions."""
+    for node in nodes:
+        children = list(ast.walk(node))
+        called = {id(x.func) for x in children if isinstance(x, ast.Call)}
+        for x in children:
+            if isinstance(x, ast.Name) and id(x) not in called:
+                yield x.id
+
+
+def iter_names(nodes: Iterable[ast.AST]) -> Iterator[str]:
+    for node in nodes:
+        if isinstance(node, ast.Name):
+            yield node.id
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield node.name
+        elif isinstance(node, ast.alias):
+            yield node.asname or node.name.split(".")[0]
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            yield from node.names
 
 
 def split_option(code: str) -> Tuple[str, str]:
@@ -228,6 +774,41 @@ def split_option(code: str) -> Tuple[str, str]:
     return code.strip(), option.strip()
 
 
+def split_inline_code(code: str) -> Tuple[str, str]:
+    code, option = split_option(code)
+    if "inspect" not in option and "fenced-code" not in option:
+        code = code.replace(";", "\n")
+    return code, option
+
+
+def is_batchable(option: str) -> bool:
+    """Return True if an inline code with the option can be executed in a batch."""
+    if "=" in option:  # Formatter kwargs are set before execution.
+        return False
+    return not any(x in option for x in ["inspect", "freeze", "fenced-code"])
+
+
+def split_timeout(option: str) -> Tuple[str, float]:
+    """Split `timeout=<sec>` from an option.
+
+    Examples
+    --------
+    >>> split_timeout("inline timeout=2.5")
+    ('inline', 2.5)
+    >>> split_timeout("inline")
+    ('inline', 0)
+    """
+    if "timeout=" not in option:
+        return option, 0
+    options, timeout = [], 0.0
+    for x in option.split(" "):
+        if x.startswith("timeout="):
+            timeout = float(x[8:])
+        elif x:
+            options.append(x)
+    return " ".join(options), timeout
+
+
 # TODO: kwargs which contains space.
 def split_kwargs_from_option(option: str) -> Tuple[str, str]:
     if "=" not in option:
@@ -4,13 +4,17 @@ import atexit
 import datetime
 import re
 import sys
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterator, List, Optional
+from queue import Empty
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from jupyter_client.client import KernelClient
 from jupyter_client.kernelspec import find_kernel_specs, get_kernel_spec
 from jupyter_client.manager import KernelManager
 
+from pheasant.renderers.jupyter.zygote import Zygote, get_zygote
 from pheasant.utils.progress import progress_bar_factory
 from pheasant.utils.time import format_timedelta_human
 
@@ -20,6 +24,9 @@ class Kernel:
     name: str
     init_code: str = ""
     language: str = ""
+    memory: int = 0  # Memory limit of the kernel process in MB. 0 for no limit.
+    zygote: Optional[Zygote] = None  # If given, the kernel is forked from it.
+    checkpoint: str = field(default="", init=False)  # Prelude of the checkpoint.
     manager: Optional[KernelManager] = field(default=None, init=False)
     client: Optional[KernelClient] = field(default=None, init=False)
     report: Dict[str, Any] = field(default_factory=dict, init=False)
@@ -33,6 +40,11 @@ class Kernel:
                 "from pheasant.renderers.jupyter.ipython import register_formatters\n"
                 "register_formatters()"
             )
+            if self.memory:
+                self.init_code += (
+                    "\nfrom pheasant.renderers.jupyter.ipython import limit_memory\n"
+                    f"limit_memory({self.memory})"
+                )
 
         def shutdown():  # pragma: no cover
             if self.manager:
@@ -50,7 +62,10 @@ class Kernel:
                 raise RuntimeError(f"Kernel {self.name} is not alive.")
 
         def start():
-            self.manager = KernelManager(kernel_name=self.name)
+            if self.zygote:
+                self.manager = self.zygote.manager()
+            else:
+                self.manager = KernelManager(kernel_name=self.name)
             self.manager.start_kernel()
             self.client = self.manager.blocking_client()
             self.client.start_channels()
@@ -61,6 +76,7 @@ class Kernel:
                 return False
             else:
                 self.client.execute_interactive(self.init_code)
+                self.checkpoint = self.zygote.preload if self.zygote else ""
                 return self.client
 
         init = f"Starting kernel [{self.name}]"
@@ -92,30 +108,160 @@ class Kernel:
             self.manager = None
 
     def restart(self) -> None:
+        self.checkpoint = ""
         if self.manager:
             self.manager.restart_kernel()
             if self.client and self.init_code:
                 self.client.execute_interactive(self.init_code)
-
-    def execute(self, code: str, output_hook=None) -> List:
+            if self.zygote:
+                self.checkpoint = self.zygote.preload
+
+    def replace(self, kernel: "Kernel") -> None:
+        """Take over a started kernel and shut down the current one in background.
+
+        Parameters
+        ----------
+        kernel
+            A started and initialized kernel of the same kernel name. The kernel
+            is left without a manager and a client.
+        """
+        manager, client = self.manager, self.client
+        self.manager, self.client = kernel.manager, kernel.client
+        self.checkpoint = kernel.checkpoint
+        kernel.manager, kernel.client = None, None
+        if manager:
+
+            def shutdown():
+                if client:
+                    client.stop_channels()
+                manager.shutdown_kernel()
+
+            threading.Thread(target=shutdown).start()
+
+    def interrupt(self) -> None:
+        if self.manager:
+            self.manager.interrupt_kernel()
+
+    def execute(self, code: str, output_hook=None, timeout: float = 0) -> List:
+        return self.execute_many([code], output_hook, timeout)[0][0]
+
+    def execute_many(
+        self,
+        codes: List[str],
+        output_hook=None,
+        timeout: float = 0,
+        stop_on_error: bool = False,
+    ) -> List[Tuple[List, Dict[str, Any]]]:
+        """Execute codes and return a list of tuples of (outputs, report).
+
+        All the codes are sent to the kernel before their outputs are collected,
+        so that the codes are executed without waiting for a round trip each.
+        See `collect` for `timeout` and `stop_on_error`.
+        """
+        msg_ids = [self.submit(code, stop_on_error) for code in codes]
+        return self.collect(msg_ids, output_hook, timeout, stop_on_error)
+
+    def submit(self, code: str, stop_on_error: bool = False) -> str:
+        """Send an execute request to the kernel and return the message id."""
         client = self.client or self.start()
-        outputs = []
-
-        def _output_hook(msg):
+        return client.execute(code, stop_on_error=stop_on_error)
+
+    def collect(
+        self,
+        msg_ids: List[str],
+        output_hook=None,
+        timeout: float = 0,
+        stop_on_error: bool = False,
+    ) -> List[Tuple[List, Dict[str, Any]]]:
+        """Collect the outputs and the reports of the submitted requests.
+
+        If a request raised NameError, the first one is raised after all the
+        requests are finished. If `stop_on_error` is True, the requests must have
+        been submitted with it. Then the results end at the first failed request,
+        whose NameError is returned as an error output instead, and the aborted
+        requests following it are left out.
+
+        If a request runs longer than `timeout` seconds, the kernel is interrupted.
+        If the kernel doesn't respond to the interrupt, it is restarted. The
+        timed-out request gets a TimeoutError output, and so do the requests left
+        unfinished by a restart. The replies of the finished requests are received
+        before the restart, which would discard them.
+        """
+        client = self.client or self.start()
+        outputs: Dict[str, List] = {msg_id: [] for msg_id in msg_ids}
+        errors: Dict[str, NameError] = {}
+        busy = set(msg_ids)
+        timed_out: List[str] = []
+        restart = False
+        deadline = time.monotonic() + timeout if timeout else None
+        while busy:
+            try:
+                remaining = deadline and max(deadline - time.monotonic(), 0)
+                msg = client.get_iopub_msg(timeout=remaining)
+            except Empty:
+                running = next(msg_id for msg_id in msg_ids if msg_id in busy)
+                if running in timed_out:  # The interrupt didn't work.
+                    restart = True
+                    timed_out.extend(msg_id for msg_id in msg_ids if msg_id in busy)
+                    break
+                timed_out.append(running)
+                self.interrupt()
+                deadline = time.monotonic() + INTERRUPT_TIMEOUT
+                continue
+            msg_id = msg["parent_header"].get("msg_id")
+            if msg_id not in busy:
+                continue
+            if msg["msg_type"] == "status":
+                if msg["content"]["execution_state"] == "idle":
+                    busy.remove(msg_id)
+                    deadline = time.monotonic() + timeout if timeout else None
+                continue
             if output_hook:
                 output_hook(msg)
-            output = output_from_msg(msg)
+            if msg_id in timed_out and msg["msg_type"] == "error":
+                continue  # KeyboardInterrupt by the interrupt.
+            try:
+                output = output_from_msg(msg)
+            except NameError as error:
+                errors.setdefault(msg_id, error)
+                continue
             if output:
-                outputs.append(output)
+                outputs[msg_id].append(output)
 
-        msg = client.execute_interactive(code, output_hook=_output_hook)
-        update_report(self.report, msg)
-        return list(stream_joiner(outputs))
-
-    def inspect(self, code: str, func: str = "getsource", output_hook=None) -> List:
-        self.execute("import inspect")
-        self.execute(code, output_hook=output_hook)
-        outputs = self.execute(code_for_inspect(func))
+        replies: Dict[str, Dict] = {}
+        while len(replies) < len(outputs) - len(busy):
+            try:
+                msg = client.get_shell_msg(timeout=REPLY_TIMEOUT)
+            except Empty:
+                break
+            msg_id = msg["parent_header"].get("msg_id")
+            if msg_id in outputs and msg_id not in busy:
+                replies[msg_id] = msg
+        if restart:
+            self.restart()
+
+        results = []
+        for msg_id in msg_ids:
+            if msg_id in replies:
+                update_report(self.report, replies[msg_id])
+            if msg_id in timed_out:
+                outputs[msg_id].append(timeout_output(timeout))
+            if stop_on_error and msg_id in errors:
+                outputs[msg_id].append(name_error_output(errors[msg_id]))
+            results.append((list(stream_joiner(outputs[msg_id])), dict(self.report)))
+            if stop_on_error and has_error(outputs[msg_id], replies.get(msg_id)):
+                return results
+        for msg_id in msg_ids:
+            if msg_id in errors:
+                raise errors[msg_id]
+        return results
+
+    def inspect(
+        self, code: str, func: str = "getsource", output_hook=None, timeout: float = 0
+    ) -> List:
+        codes = ["import inspect", code, code_for_inspect(func)]
+        results = self.execute_many(codes, output_hook, timeout)
+        outputs = results[-1][0]
         if len(outputs) == 1 and outputs[0]["type"] == "execute_result":
             source = ast.literal_eval(outputs[0]["data"]["text/plain"])
             return [dict(type="stream", name="source", text=source)]
@@ -123,6 +269,36 @@ class Kernel:
             return outputs
 
 
+INTERRUPT_TIMEOUT = 5  # Seconds to wait for an interrupted kernel.
+REPLY_TIMEOUT = 5  # Seconds to wait for the reply of a finished request.
+
+
+def name_error_output(error: NameError) -> Dict[str, Any]:
+    return dict(type="error", ename="NameError", evalue=str(error), traceback="")
+
+
+def raise_name_error(outputs: List[Dict[str, Any]]) -> None:
+    """Raise NameError if outputs have an error output made by `name_error_output`."""
+    for output in outputs:
+        if output["type"] == "error" and output["ename"] == "NameError":
+            raise NameError(output["evalue"])
+
+
+def has_error(outputs: List[Dict[str, Any]], reply: Optional[Dict]) -> bool:
+    """Return True if a request failed or didn't finish."""
+    if reply is None or reply["content"]["status"] != "ok":
+        return True
+    return any(output["type"] == "error" for output in outputs)
+
+
+def timeout_output(timeout: float, kind: str = "Cell") -> Dict[str, Any]:
+    """Return an error output for a timeout. `timeout` key tells it from others."""
+    evalue = f"{kind} execution timed out after {round(timeout, 1):g} seconds."
+    return dict(
+        type="error", ename="TimeoutError", evalue=evalue, traceback="", timeout=True
+    )
+
+
 def code_for_inspect(func: str) -> str:
     codes = [
         f"__dummy__ = _",
@@ -139,6 +315,13 @@ def code_for_inspect(func: str) -> str:
 class Kernels:
     _kernel_names: Dict[str, list] = field(default_factory=dict)
     kernels: Dict[str, Kernel] = field(default_factory=dict)
+    spares: int = 0  # Number of started kernels kept for each kernel name.
+    memory: int = 0  # Memory limit of each kernel process in MB.
+    fork: bool = False  # If True, python kernels are forked from a zygote.
+    preload: str = ""  # Code run in the zygote before forking.
+    pool: Dict[str, List[Kernel]] = field(default_factory=dict, init=False)
+    threads: List[threading.Thread] = field(default_factory=list, init=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, init=False)
 
     @property
     def kernel_names(self) -> Dict[str, list]:
@@ -164,23 +347,79 @@ class Kernels:
 
     def get_kernel(self, kernel_name: str) -> Kernel:
         if kernel_name not in self.kernels:
-            self.kernels[kernel_name] = Kernel(kernel_name)
+            kernel = self.get_spare(kernel_name)
+            kernel = kernel or self.new_kernel(kernel_name)
+            self.kernels[kernel_name] = kernel
+            self.fill(kernel_name)
         return self.kernels[kernel_name]
 
+    def new_kernel(self, kernel_name: str) -> Kernel:
+        zygote = get_zygote(kernel_name, self.preload) if self.fork else None
+        return Kernel(kernel_name, memory=self.memory, zygote=zygote)
+
+    def get_spare(self, kernel_name: str) -> Optional[Kernel]:
+        """Pop a started spare kernel if any, and fill the pool in background."""
+        with self.lock:
+            pool = self.pool.get(kernel_name)
+            kernel = pool.pop(0) if pool else None
+        if kernel:
+            self.fill(kernel_name)
+        return kernel
+
+    def fill(self, kernel_name: str) -> None:
+        """Start spare kernels in background up to `spares`."""
+
+        def start():
+            kernel = self.new_kernel(kernel_name)
+            try:
+                kernel.start()
+            finally:
+                with self.lock:
+                    if kernel.client:
+                        self.pool[kernel_name].append(kernel)
+                    self.threads.remove(threading.current_thread())
+
+        with self.lock:
+            pool = self.pool.setdefault(kernel_name, [])
+            starting = sum(thread.name == kernel_name for thread in self.threads)
+            for _ in range(self.spares - len(pool) - starting):
+                thread = threading.Thread(target=start, name=kernel_name)
+                self.threads.append(thread)
+                thread.start()
+
     def __getitem__(self, language: str) -> Kernel:
         kernel_name = self.get_kernel_name(language)
         if not kernel_name:
             raise KeyError(f"No kernel found for language {language}.")
         return self.get_kernel(kernel_name)
 
-    def shutdown(self):
+    def shutdown(self, keep_spares: bool = False):
+        """Shutdown the kernels.
+
+        Parameters
+        ----------
+        keep_spares
+            If True, the spare kernels are kept running to be used next time.
+        """
         for kernel_name in list(self.kernels.keys()):
             kernel = self.kernels.pop(kernel_name)
             kernel.shutdown()
+        if keep_spares:
+            return
+        for thread in list(self.threads):
+            thread.join()
+        for pool in self.pool.values():
+            while pool:
+                pool.pop().shutdown()
 
     def restart(self):
-        for kernel in self.kernels.values():
-            kernel.restart()
+        """Restart the kernels. A spare kernel is swapped in if available."""
+        for kernel_name, kernel in self.kernels.items():
+            spare = self.get_spare(kernel_name)
+            if spare:
+                kernel.replace(spare)
+            else:
+                kernel.restart()
 
 
 kernels = Kernels()
@@ -0,0 +1,103 @@
+"""Content-addressed store of executed cells shared across checkouts."""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import zlib
+from typing import Any, Dict, List, Optional
+
+from jupyter_client.kernelspec import get_kernel_spec
+
+import pheasant
+
+try:
+    from importlib.metadata import distributions
+except ImportError:  # pragma: no cover, Python 3.7
+    distributions = None  # type:ignore
+
+STORE_ENV = "PHEASANT_STORE"
+
+environments: Dict[str, str] = {}
+
+
+def get_environment(kernel_name: str) -> str:
+    """Return a fingerprint of the environment where a kernel runs.
+
+    It consists of the version of pheasant, the kernel spec, the Python version
+    and the installed packages. Packages are of the interpreter running
+    pheasant, so a kernel spec pointing to another interpreter is told apart by
+    its command line only.
+    """
+    if kernel_name not in environments:
+        spec = get_kernel_spec(kernel_name)
+        kernel = dict(argv=spec.argv, language=spec.language, env=spec.env)
+        environment = dict(
+            pheasant=pheasant.__version__,
+            kernel=kernel,
+            python=sys.version,
+            packages=get_packages(),
+        )
+        text = json.dumps(environment, sort_keys=True)
+        environments[kernel_name] = hash_text(text)
+    return environments[kernel_name]
+
+
+def get_packages() -> List[str]:
+    if distributions is None:  # pragma: no cover
+        return []
+    packages = {f"{d.metadata['Name']}=={d.version}" for d in distributions()}
+    return sorted(packages)
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class Store:
+    """Directory of executed cells addressed by the cell key and the environment.
+
+    A cell is written to `<root>/<address[:2]>/<address>` as compressed JSON.
+    Files are replaced atomically, so that the root can be shared by several
+    processes, e.g. CI runners restoring it from a shared cache.
+
+    Parameters
+    ----------
+    root
+        Root directory of the store. Created if necessary.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def address(self, key: str, environment: str) -> str:
+        return hash_text("\0".join([environment, key]))
+
+    def path(self, address: str) -> str:
+        return os.path.join(self.root, address[:2], address)
+
+    def __contains__(self, address: str) -> bool:
+        return os.path.exists(self.path(address))
+
+    def get(self, address: str) -> Optional[Dict[str, Any]]:
+        """Return a stored cell, or None if not found or broken."""
+        try:
+            with open(self.path(address), "rb") as f:
+                return json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        except (OSError, ValueError, zlib.error):
+            return None
+
+    def put(self, address: str, cell: Dict[str, Any]) -> None:
+        path = self.path(address)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        data = zlib.compress(json.dumps(cell).encode("utf-8"))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=address, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
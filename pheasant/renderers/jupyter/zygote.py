@@ -0,0 +1,256 @@
+"""Python kernels forked from a warm zygote process.
+
+A zygote is a Python process which has imported ipykernel and run the preload
+code, but has started no kernel. For each kernel, a tiny proxy process asks the
+zygote for a fork and stands for the forked kernel in the eyes of the kernel
+manager. The forked kernels share the memory pages of the zygote copy-on-write,
+so that the imported modules are neither loaded again nor copied.
+
+The proxy forwards signals to the kernel and exits when the kernel exits. The
+kernel exits when the proxy is killed.
+"""
+import ast
+import atexit
+import importlib
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from jupyter_client.kernelspec import get_kernel_spec
+from jupyter_client.manager import KernelManager
+from traitlets import Unicode
+
+MODULE = "pheasant.renderers.jupyter.zygote"
+
+
+def forkable(kernel_name: str) -> bool:
+    """Return True if the kernel can be forked from a zygote."""
+    if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+        return False  # pragma: no cover
+    kernel_spec = get_kernel_spec(kernel_name)
+    launcher = kernel_spec.argv[1:3]
+    return kernel_spec.language == "python" and launcher in [
+        ["-m", "ipykernel_launcher"],
+        ["-m", "ipykernel"],
+    ]
+
+
+class ForkKernelManager(KernelManager):
+    """Kernel manager which launches a proxy of a kernel forked from a zygote."""
+
+    zygote = Unicode("", help="Socket path of the zygote.")
+
+    def format_kernel_cmd(self, extra_arguments: Optional[List[str]] = None):
+        executable = super().format_kernel_cmd(extra_arguments)[0]
+        return [executable, "-m", MODULE, "connect", self.zygote, self.connection_file]
+
+
+@dataclass
+class Zygote:
+    kernel_name: str
+    preload: str = ""  # Code run in the zygote. Its names are given to kernels.
+    path: str = field(default="", init=False)
+    process: Optional[subprocess.Popen] = field(default=None, init=False)
+
+    def __post_init__(self):
+        atexit.register(self.shutdown)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, timeout: float = 60) -> None:
+        """Start the zygote and wait until it accepts forks."""
+        kernel_spec = get_kernel_spec(self.kernel_name)
+        executable = kernel_spec.argv[0]
+        if executable in ["python", "python3"]:
+            executable = sys.executable
+        directory = tempfile.mkdtemp(prefix="pheasant-zygote-")
+        self.path = os.path.join(directory, "zygote.sock")
+        env = dict(os.environ, **kernel_spec.env)
+        cmd = [executable, "-m", MODULE, "serve", self.path, self.preload]
+        self.process = subprocess.Popen(cmd, env=env, stdin=subprocess.DEVNULL)
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(self.path):
+            code = self.process.poll()
+            if code is not None:
+                self.shutdown()
+                raise RuntimeError(f"Zygote [{self.kernel_name}] exited ({code}).")
+            if time.monotonic() > deadline:  # pragma: no cover
+                self.shutdown()
+                raise TimeoutError(f"Zygote [{self.kernel_name}] didn't start.")
+            time.sleep(0.01)
+
+    def shutdown(self) -> None:
+        if self.process:
+            if self.process.poll() is None:
+                self.process.terminate()
+                self.process.wait()
+            self.process = None
+        if self.path:
+            shutil.rmtree(os.path.dirname(self.path), ignore_errors=True)
+            self.path = ""
+
+    def manager(self) -> KernelManager:
+        """Return a kernel manager which forks a kernel from this zygote."""
+        if not self.alive:
+            self.start()
+        return ForkKernelManager(kernel_name=self.kernel_name, zygote=self.path)
+
+
+zygotes: Dict[Tuple[str, str], Zygote] = {}
+zygotes_lock = threading.Lock()
+
+
+def get_zygote(kernel_name: str, preload: str = "") -> Optional[Zygote]:
+    """Return a started zygote shared in the process, or None if not forkable.
+
+    Parameters
+    ----------
+    kernel_name
+        Kernel name.
+    preload
+        Code run in the zygote before forking kernels. It must not start threads.
+        If it is not plain Python, such as magics and shell escapes, the kernels
+        are not forked.
+    """
+    if not forkable(kernel_name):
+        return None
+    if not is_python(preload):
+        message = "Prelude is not plain Python. Kernels are not forked."
+        warnings.warn(message, RuntimeWarning)
+        return None
+    with zygotes_lock:
+        zygote = zygotes.get((kernel_name, preload))
+        if zygote is None or not zygote.alive:
+            zygote = Zygote(kernel_name, preload)
+            zygote.start()
+            zygotes[(kernel_name, preload)] = zygote
+    return zygote
+
+
+def is_python(code: str) -> bool:
+    """Return True if a code runs without IPython.
+
+    Examples
+    --------
+    >>> is_python("import os")
+    True
+    >>> is_python("%matplotlib inline")
+    False
+    >>> is_python("get_ipython().system('ls')")
+    False
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    return "get_ipython" not in names
+
+
+def send(file, message: Dict[str, Any]) -> None:
+    file.write(json.dumps(message).encode("utf-8") + b"\n")
+    file.flush()
+
+
+def serve(path: str, preload: str) -> None:  # pragma: no cover
+    """Run the preload code and fork a kernel for each request."""
+    importlib.import_module("ipykernel.kernelapp")  # Shared by the kernels.
+
+    namespace: Dict[str, Any] = {"__name__": "__main__"}
+    if preload:
+        exec(compile(preload, "<preload>", "exec"), namespace)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Reap the kernels.
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path + ".tmp")
+    server.listen(16)
+    os.rename(path + ".tmp", path)  # Ready to accept.
+    while True:
+        connection, _ = server.accept()
+        if os.fork() == 0:
+            try:
+                server.close()
+                spawn(connection, namespace, bool(preload))
+            finally:
+                os._exit(1)
+        connection.close()
+
+
+def spawn(connection, namespace: Dict[str, Any], checkpoint: bool):  # pragma: no cover
+    """Start a kernel in a forked process.
+
+    The names of the preload code are given to the kernel namespace. If
+    `checkpoint` is True, a namespace checkpoint is taken with them.
+    """
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    os.setsid()  # The proxy signals the process group of the kernel.
+    file = connection.makefile("rwb")
+    message = json.loads(file.readline())
+    os.chdir(message["cwd"])
+    send(file, {"pid": os.getpid()})
+
+    def watch():
+        connection.recv(1)  # Returns when the proxy has gone.
+        os._exit(1)
+
+    threading.Thread(target=watch, daemon=True).start()
+
+    from ipykernel.kernelapp import IPKernelApp
+
+    app = IPKernelApp.instance()
+    parent = f"--IPKernelApp.parent_handle={os.getppid()}"  # Exits with the zygote.
+    app.initialize(["-f", message["connection_file"], parent])
+    namespace.pop("__builtins__", None)
+    assert app.shell is not None
+    app.shell.user_ns.update(namespace)
+    if checkpoint:
+        from pheasant.renderers.jupyter.ipython import checkpoint as take
+
+        take()
+    app.start()
+    os._exit(0)
+
+
+def connect(path: str, connection_file: str) -> None:  # pragma: no cover
+    """Ask the zygote for a kernel and wait for it as its proxy."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    file = client.makefile("rwb")
+    connection_file = os.path.abspath(connection_file)
+    send(file, {"connection_file": connection_file, "cwd": os.getcwd()})
+    pid = json.loads(file.readline())["pid"]
+
+    def forward(signum, frame):
+        try:
+            os.killpg(pid, signum)
+        except OSError:
+            pass
+
+    for signum in [signal.SIGINT, signal.SIGTERM, signal.SIGHUP]:
+        signal.signal(signum, forward)
+    file.read()  # Returns when the kernel exits.
+
+
+def main(argv: List[str]) -> None:  # pragma: no cover
+    command, *args = argv
+    if command == "serve":
+        serve(*args)
+    elif command == "connect":
+        connect(*args)
+    else:
+        raise ValueError(f"Unknown command: {command}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main(sys.argv[1:])
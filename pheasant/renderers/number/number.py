@@ -1,19 +1,25 @@
 """Automatic numbering renderer."""
 import os
 import re
+import threading
 from dataclasses import field
+from functools import lru_cache
 from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from markdown import Markdown
 
 from pheasant.core.decorator import commentable
 from pheasant.core.renderer import Renderer
+from pheasant.renderers.number.tags import TagIndex
 
 
 class Header(Renderer):
     tag_context: Dict[str, Any] = field(default_factory=dict)
     number_list: Dict[str, List[int]] = field(default_factory=dict)
     header_kind: Dict[str, str] = field(default_factory=dict)
+    memo: Dict[str, str] = field(default_factory=dict, init=False)
+    page_tags: Dict[str, Dict[str, Any]] = field(default_factory=dict, init=False)
+    index: Optional[TagIndex] = field(default=None, init=False)
 
     HEADER_PATTERN = r"^(?P<prefix>#+)(?P<header>[!\w]*) *(?P<title>.*?)\n"
     TAG_PATTERN = r"\{#(?P<tag>.+?)#\}"
@@ -26,7 +32,8 @@ class Header(Renderer):
         self.set_template("header")
         self.header_kind.update(fig="figure", tab="table", eq="equation")
         prefix = dict(figure="Figure", table="Table")
-        self.set_config(prefix=prefix, number=dict(separator="."))
+        # index: Path of a persistent tag index. Empty for no index.
+        self.set_config(prefix=prefix, number=dict(separator="."), index="")
         self.start()
 
     def start(self) -> None:
@@ -35,6 +42,62 @@ class Header(Renderer):
         for kind in list(self.config["prefix"].keys()) + ["header", "equation"]:
             self.number_list[kind] = [0] * 6
 
+    def enter(self) -> None:
+        self.page_tags = {}
+
+    def exit(self) -> None:
+        index = self.get_index()
+        if index and self.page.path:
+            # Stored with absolute paths to be found from any working directory.
+            tags = {
+                tag: dict(context, path=os.path.abspath(context["path"]))
+                for tag, context in self.page_tags.items()
+            }
+            index.update(os.path.abspath(self.page.path), tags)
+
+    def abort(self) -> None:
+        self.page_tags = {}  # The tags of a partial page are not indexed.
+
+    def set_config(self, *args, **kwargs) -> None:
+        super().set_config(*args, **kwargs)
+        self.memo.clear()
+
+    def get_index(self) -> Optional[TagIndex]:
+        path = self.config["index"]
+        if not path:
+            return None
+        if self.index is None or self.index.path != path:
+            self.index = TagIndex(path)
+        return self.index
+
+    def find(self, tag: str) -> Optional[Dict[str, Any]]:
+        """Return the context of a tag from this conversion or the tag index.
+
+        Tags in the index are found even if their pages have not been converted
+        in this process.
+        """
+        if tag in self.tag_context:
+            return self.tag_context[tag]
+        index = self.get_index()
+        context = index.get(tag) if index else None
+        if context and os.path.exists(context["path"]):
+            return context
+        return None
+
+    def render(self, name: str, context: Dict[str, Any], **kwargs) -> str:
+        """Render a template, reusing the output of the same context.
+
+        Numbering is resolved before rendering, so that an unchanged header of a
+        rebuilt page is spliced from the previous output.
+        """
+        template = self.config[f"{name}_template"]
+        key = repr((id(template), sorted(context.items()), sorted(kwargs.items())))
+        if key not in self.memo:
+            if len(self.memo) >= MEMO_SIZE:
+                self.memo.clear()
+            self.memo[key] = super().render(name, context, **kwargs)
+        return self.memo[key]
+
     def render_header(self, context, splitter, parser) -> Iterator[str]:
         if context["header"] == "!":
             self.start()
@@ -146,6 +209,7 @@ class Header(Renderer):
                 "path": self.page.path,
                 "title": title,
             }
+            self.page_tags[tag] = self.tag_context[tag]
             context.update(tag=tag)
         return context
 
@@ -154,7 +218,7 @@ def get_content_from_cell(cell, kind, splitter, parser) -> str:
     if cell.source.startswith("~~~") and kind in "figure table":
         content = cell.context["source"] + "\n"
         content = parser.parse(content, decorate=False)
-        return Header.markdown.convert(content)
+        return convert_markdown(content)
     else:
         if cell.source.startswith("```") and kind in "figure table":
             cell.context["option"] += " inline"
@@ -170,10 +234,21 @@ def get_content(source: str) -> Tuple[str, str]:
         content, rest = source, ""
     else:
         content, rest = source[:index], "\n" + source[index + 2 :]
-    content = Header.markdown.convert(content)
+    content = convert_markdown(content)
     return content, rest
 
 
+MARKDOWN_LOCK = threading.Lock()
+MEMO_SIZE = 4096
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def convert_markdown(source: str) -> str:
+    """Convert Markdown into HTML. Header.markdown is shared among threads."""
+    with MARKDOWN_LOCK:
+        return Header.markdown.convert(source)
+
+
 class Anchor(Renderer):
     header: Optional[Header] = field(default=None)
 
@@ -185,6 +260,8 @@ class Anchor(Renderer):
     def render_tag(self, context, splitter, parser) -> Iterator[str]:
         tag = context["tag"]
         context = self.resolve(tag)
+        if context["found"]:
+            self.page.depend(context["path"])
         yield self.render("anchor", context, reference=True)
 
     def resolve(self, tag: str) -> Dict[str, Any]:
@@ -196,11 +273,11 @@ class Anchor(Renderer):
         else:
             fmt = ""
         tag = tag.strip()
-        tag_context = self.header.tag_context  # type: ignore
-        found = tag in tag_context
+        tag_context = self.header.find(tag)
+        found = tag_context is not None
         context = {"found": found, "tag": tag}
-        if found:
-            context.update(tag_context[tag])
+        if tag_context is not None:
+            context.update(tag_context)
             if fmt:
                 context["number_string"] = format_tag(
                     fmt, context["number_list"], context["title"]
@@ -0,0 +1,68 @@
+"""Persistent index of the tags defined in pages."""
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS tags (tag TEXT PRIMARY KEY, path TEXT, context TEXT)"
+)
+
+
+class TagIndex:
+    """SQLite database of tag contexts which survives a converter process.
+
+    Parameters
+    ----------
+    path
+        Path of the database file. Its directory is created if necessary.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False
+            )
+            connection.execute(SCHEMA)
+            self.connection = connection
+        return self.connection
+
+    def update(self, path: str, tags: Dict[str, Dict[str, Any]]) -> None:
+        """Replace the tags of a page.
+
+        Parameters
+        ----------
+        path
+            Page path.
+        tags
+            Dictionary of tag to its context.
+        """
+        rows = [(tag, path, json.dumps(context)) for tag, context in tags.items()]
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute("DELETE FROM tags WHERE path = ?", (path,))
+                sql = "INSERT OR REPLACE INTO tags VALUES (?, ?, ?)"
+                connection.executemany(sql, rows)
+
+    def get(self, tag: str) -> Optional[Dict[str, Any]]:
+        """Return the context of a tag, or None if not found."""
+        with self.lock:
+            sql = "SELECT context FROM tags WHERE tag = ?"
+            row = self.connect().execute(sql, (tag,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,163 @@
+"""Timing instrumentation of the conversion pipeline.
+
+The module-level `profiler` collects the elapsed time per page, split into
+parser stages, renderers, timers (`template`, `kernel`, `cache_load` and
+`cache_save`) and cells. It does nothing until enabled by `profiler.profile`.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+def new_page() -> Dict[str, Any]:
+    return {"stages": {}, "renderers": {}, "timers": {}, "cells": []}
+
+
+@dataclass
+class Profiler:
+    enabled: bool = False
+    pages: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def clear(self) -> None:
+        self.pages.clear()
+
+    def add(self, path: str, kind: str, name: str, elapsed: float) -> None:
+        """Add an elapsed time to a page and to the current cell for timers."""
+        with self.lock:
+            page = self.pages.setdefault(path, new_page())
+            page[kind][name] = page[kind].get(name, 0.0) + elapsed
+        cell = getattr(self.local, "cell", None)
+        if cell is not None and kind == "timers":
+            cell[name] = cell.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def timer(self, path: str, kind: str, name: str) -> Iterator[None]:
+        """Time the block as `name` of `kind` in a page.
+
+        Parameters
+        ----------
+        path
+            Page path.
+        kind
+            One of 'stages', 'renderers' or 'timers'.
+        name
+            Name of the stage, renderer or timer.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(path, kind, name, time.perf_counter() - start)
+
+    @contextmanager
+    def renderer(self, path: str, name: str) -> Iterator[None]:
+        """Time a render of a cell, excluding the renders nested in it."""
+        if not self.enabled or getattr(self.local, "rendering", False):
+            yield
+            return
+        self.local.rendering = True
+        try:
+            with self.timer(path, "renderers", name):
+                yield
+        finally:
+            self.local.rendering = False
+
+    def iterate(
+        self, iterator: Iterator[T], path: str, kind: str, name: str
+    ) -> Iterator[T]:
+        """Yield from an iterator, timing only the time to get each item."""
+        while True:
+            with self.timer(path, kind, name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    @contextmanager
+    def cell(self, path: str, **info) -> Iterator[None]:
+        """Time a cell. Timers in the block are also added to the cell."""
+        if not self.enabled:
+            yield
+            return
+        cell: Dict[str, Any] = dict(info)
+        previous = getattr(self.local, "cell", None)
+        self.local.cell = cell
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cell["total"] = time.perf_counter() - start
+            self.local.cell = previous
+            with self.lock:
+                self.pages.setdefault(path, new_page())["cells"].append(cell)
+
+    def report(self) -> Dict[str, Any]:
+        """Return a JSON serializable report."""
+        pages = {}
+        timers: Dict[str, float] = {}
+        with self.lock:
+            for path, page in self.pages.items():
+                pages[path] = dict(page, total=sum(page["stages"].values()))
+                for name, elapsed in page["timers"].items():
+                    timers[name] = timers.get(name, 0.0) + elapsed
+        total = sum(page["total"] for page in pages.values())
+        return {"total": total, "timers": timers, "pages": pages}
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def summary(self, limit: int = 10) -> List[str]:
+        """Return lines of the total time and the slowest pages."""
+        report = self.report()
+        timers = report["timers"].items()
+        lines = [
+            f"Total: {report['total']:.3f}s ("
+            + ", ".join(f"{name}: {elapsed:.3f}s" for name, elapsed in timers)
+            + ")"
+        ]
+        pages = sorted(report["pages"].items(), key=lambda x: -x[1]["total"])
+        for path, page in pages[:limit]:
+            stages = page["stages"].items()
+            lines.append(
+                f"{page['total']:.3f}s {path} ("
+                + ", ".join(f"{name}: {elapsed:.3f}s" for name, elapsed in stages)
+                + ")"
+            )
+        return lines
+
+    @contextmanager
+    def profile(self, path: str = "") -> Iterator[None]:
+        """Enable the profiler in the block and write the report to a JSON file.
+
+        Parameters
+        ----------
+        path
+            Output path of the report. If empty, the profiler is not enabled.
+        """
+        if not path:
+            yield
+            return
+        self.clear()
+        self.enabled = True
+        try:
+            yield
+        finally:
+            self.enabled = False
+            self.dump(path)
+
+
+profiler = Profiler()
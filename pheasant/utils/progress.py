@@ -1,9 +1,9 @@
 import datetime
 import math
 import sys
-from contextlib import redirect_stderr, redirect_stdout
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
 from dataclasses import dataclass, field
-from typing import Any, Callable, List, Optional, Union
+from typing import Any, Callable, Iterator, List, Optional, Union
 
 import colorama
 from termcolor import colored
@@ -98,6 +98,22 @@ class ProgressBarManager:
         self.flush = sys.stdout.flush
         self.stream = Buffer(sys.stdout)
 
+    @contextmanager
+    def redirect(self, stream) -> Iterator[None]:
+        """Write progress bars and outputs to another stream temporarily."""
+        saved = self.write, self.flush, self.stream
+        self.write, self.flush, self.stream = stream.write, stream.flush, Buffer(stream)
+        try:
+            with redirect_stdout(stream):
+                yield
+        finally:
+            self.write, self.flush, self.stream = saved
+
+    def isatty(self) -> bool:
+        """Return True if progress bars are written to a terminal."""
+        isatty = getattr(self.stream.stream, "isatty", None)
+        return bool(isatty and isatty())
+
     def get_progress_bar(self, total: int = 0, multi: int = 0, init: str = ""):
         progress_bar = ProgressBar(total=total, multi=multi, init=init, parent=self)
         self.progress_bars.append(progress_bar)
@@ -90,6 +90,7 @@ setup(
     tests_require=[
         "pytest",
         "pytest-cov",
+        "pytest-benchmark",
         "altair",
         "bokeh",
         "holoviews",
@@ -0,0 +1,58 @@
+import os
+import time
+
+from pheasant.core.cache import CacheManager
+from pheasant.core.page import Page
+
+
+def make_cache(path, size, atime):
+    page = Page(path)
+    page.cache.save([{"key": "x" * size}], compress=False)
+    mtime = os.stat(page.cache.path).st_mtime
+    os.utime(page.cache.path, (atime, mtime))
+    return page
+
+
+def test_cache_manager(tmpdir):
+    now = time.time()
+    a = make_cache(tmpdir.join("a.md").ensure().strpath, 100, now - 30)
+    b = make_cache(tmpdir.join("sub", "b.md").ensure().strpath, 100, now - 20)
+    c = make_cache(tmpdir.join("c.md").strpath, 100, now - 10)  # Orphan
+    tmpdir.join(".git", ".pheasant_cache", "d.md.cache").ensure()
+    tmpdir.join("sub", "loop").mksymlinkto(tmpdir)
+    tmp = tmpdir.join(".pheasant_cache", "e.md.cache.tmp").ensure()  # Being written.
+
+    manager = CacheManager([tmpdir.strpath])
+    caches = manager.collect()
+    assert sorted(cache.source for cache in caches) == sorted([a.path, b.path, c.path])
+    stats = manager.stats()
+    assert stats["count"] == 3
+    assert stats["orphans"] == 1
+    assert stats["orphan_size"] == c.cache.size
+
+    assert [cache.source for cache in manager.select()] == [c.path]
+    selected = manager.select(max_size=int(b.cache.size))
+    assert [cache.source for cache in selected] == [c.path, a.path]
+    selected = manager.select(max_age=15 / 86400)
+    assert [cache.source for cache in selected] == [a.path, b.path, c.path]
+
+    assert len(manager.gc(max_size=1, dry_run=True)) == 3
+    assert a.has_cache
+    assert len(manager.gc(max_size=int(b.cache.size))) == 2
+    assert not a.has_cache and b.has_cache
+    assert tmp.check()
+    assert len(manager.caches) == 1
+
+    os.utime(tmp.strpath, (now - 7200, now - 7200))  # Left by a failed save.
+    manager.collect()
+    assert [cache.path for cache in manager.gc()] == [tmp.strpath]
+    assert not os.path.exists(tmpdir.join(".pheasant_cache").strpath)
+
+
+def test_cache_load_atime(tmpdir):
+    page = make_cache(tmpdir.join("a.md").ensure().strpath, 10, 0)
+    mtime = os.stat(page.cache.path).st_mtime_ns
+    page.cache.load()
+    stat = os.stat(page.cache.path)
+    assert stat.st_atime > 0
+    assert stat.st_mtime_ns == mtime
@@ -32,3 +32,45 @@ def test_converter_special_function(converter):
     assert repr(converter["preprocess", "jupyter"]) == "<Jupyter#jupyter[2]>"
     with pytest.raises(KeyError):
         converter["preprocess", "abc"]
+
+
+def test_converter_iter_convert(jupyter, tmpdir):
+    f = tmpdir.join("example.md")
+    f.write("# a\n## b\n```python\n2*3\n```\n")
+    path = f.strpath
+
+    converter = Converter()
+    converter.register([jupyter, Header()])
+    chunks = list(converter.iter_convert(path))
+    assert len(chunks) > 1
+    output = "".join(chunks)
+    assert '<span class="number">1</span>' in output
+    assert '<code class="python">6</code>' in output
+
+
+def test_converter_iter_convert_close(jupyter, tmpdir):
+    f = tmpdir.join("example.md")
+    f.write("# a {#a#}\n```python\n2*3\n```\n## b {#b#}\n```python\n3*4\n```\n")
+    path = f.strpath
+
+    header = Header()
+    header.set_config(index=tmpdir.join("tags.db").strpath)
+    converter = Converter()
+    converter.register([header, jupyter], "main")
+
+    def close_early():
+        chunks = converter.iter_convert_by_name(path, "main")
+        assert "a" in next(chunks)
+        chunks.close()  # The caller stops early.
+
+    close_early()
+    page = converter.pages[path]
+    assert not page.has_cache  # A partial page isn't cached.
+    output = "".join(converter.iter_convert_by_name(path, "main"))
+    assert "12" in output
+    assert len(page.cache.load()[0]) == 2
+    assert header.get_index().get("b")
+
+    close_early()
+    assert len(page.cache.load()[0]) == 2
+    assert header.get_index().get("b")  # Not replaced by the tags seen so far.
@@ -1,7 +1,7 @@
 import os
 
 import pheasant
-from pheasant.core.page import Pages
+from pheasant.core.page import Page, Pages
 
 
 def test_pages():
@@ -15,3 +15,68 @@ def test_pages():
     d = pages.to_dict()
     assert "pages" in d
     assert isinstance(d['pages'], list)
+
+
+def test_cache(tmpdir):
+    page = Page(tmpdir.join("example.md").strpath)
+    assert page.cache.load() is None
+
+    items = [{"key": str(k), "output": "<p>output</p>" * 100} for k in range(3)]
+    page.cache.save(items, {"a": 1}, index=["key"])
+    size = page.cache.size
+    loaded, meta = page.cache.load()
+    assert meta == {"a": 1}
+    assert [item["key"] for item in loaded] == ["0", "1", "2"]
+    assert all(item.payload is None for item in loaded)
+    assert loaded[1]["output"] == items[1]["output"]
+    assert loaded[1].payload is not None
+    assert loaded[2].payload is None
+    assert loaded[2].load() == items[2]
+
+    page.cache.save(items, index=["key"], compress=False)
+    assert page.cache.size > size
+    loaded, meta = page.cache.load()
+    assert meta == {}
+    assert loaded[0]["output"] == items[0]["output"]
+
+    with open(page.cache.path, "wb") as f:
+        f.write(b"old format")
+    assert page.cache.load() is None
+
+
+def test_spill(tmpdir):
+    page = Page(tmpdir.join("example.md").strpath)
+    page.source = "abc\r\n"
+    directory = tmpdir.join("pages").strpath
+    page.spill(directory)
+    assert page._source == ""
+    assert os.path.dirname(page.spilled) == directory
+    assert page.source == "abc\r\n"
+    page.source = "def"
+    assert page.spilled == ""
+    assert page.source == "def"
+
+
+def test_pages_collect(tmpdir):
+    for path in ["b.md", "a.py", "c.txt", "sub/d.md", ".git/e.md", "skip/f.md"]:
+        tmpdir.join(path).ensure()
+    page = Page(tmpdir.join("b.md").strpath)
+    page.cache.save([{"key": "1"}])
+    os.utime(page.path, (0, 0))
+
+    pages = Pages([tmpdir.strpath], "md,py", ignore=["skip"]).collect()
+    names = [os.path.relpath(page.path, tmpdir.strpath) for page in pages]
+    assert names == ["a.py", "b.md", os.path.join("sub", "d.md")]
+    assert [page.has_cache for page in pages] == [False, True, False]
+    assert [page.modified for page in pages] == [True, False, True]
+    assert pages[1].cache.size == page.cache.size
+
+    pages[1].cache.delete()
+    assert not pages[1].has_cache
+    assert pages[1].modified
+    pages = Pages([tmpdir.join("skip", "f.md").strpath], "md", ["*"]).collect()
+    assert len(pages) == 1
+
+    tmpdir.join("sub", "loop").mksymlinkto(tmpdir)
+    pages = Pages([tmpdir.strpath], "md,py", ignore=["skip"]).collect()
+    assert len(pages) == 3
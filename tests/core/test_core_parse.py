@@ -73,3 +73,15 @@ def test_core_parse_with_decorate():
 
     source = "a12aa345"
     assert parser.parse(source) == "{B}<12>[{B}<345>]"
+
+
+def test_core_iter_parse():
+    parser = Parser()
+    a = A()
+    parser.register(a.pattern_d, a.render_digit)
+    parser.register(a.pattern_w, a.render_word)
+
+    source = "1 a 2 c"
+    chunks = list(parser.iter_parse(source))
+    assert chunks == ["1", " ", "a", " ", "2", " ", "[4]"]
+    assert "".join(chunks) == parser.parse(source)
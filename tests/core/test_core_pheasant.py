@@ -25,3 +25,91 @@ def test_pheasant(tmpdir):
     assert converter.pages[path].st_mtime > st_mtime
     assert converter.pages[path].st_mtime == os.stat(path).st_mtime
     assert 'class="python">2</code>' in output
+
+
+def test_pheasant_workers(tmpdir):
+    paths = []
+    for k in range(3):
+        f = tmpdir.join(f"example{k}.md")
+        f.write(f"# Title\n```python\na = {k}\na\n```\n")
+        paths.append(f.strpath)
+
+    converter = Pheasant(workers=2)
+    outputs = converter.convert_from_files(paths)
+    for k, output in enumerate(outputs):
+        assert f'<code class="nohighlight">{k}</code>' in output
+        assert "cached" in output
+
+
+def test_pheasant_iter_convert(tmpdir):
+    f = tmpdir.join("example.md")
+    f.write("# Title {#tag#}\n```python\n1\n```\nSee {#tag#}.\n")
+    path = f.strpath
+
+    converter = Pheasant()
+    output = "".join(converter.iter_convert(path))
+    assert "{#tag#}" not in output
+    assert "{#tag#}" in converter.pages[path].source
+
+
+def test_pheasant_depends(tmpdir):
+    a = tmpdir.join("a.md")
+    a.write("# Title\n{%b.txt%}\nSee {#tag#}.\n")
+    b = tmpdir.join("b.txt")
+    b.write("abc")
+    c = tmpdir.join("c.md")
+    c.write("# Section {#tag#}\n")
+    paths = [a.strpath, c.strpath]
+
+    converter = Pheasant()
+    output = converter.convert_from_files(paths)[0]
+    assert "abc" in output
+    assert "[2](c.md#tag)" in output
+    page = converter.pages[a.strpath]
+    assert set(page.depends) == {b.strpath, c.strpath}
+
+    st_mtime = page.depends[b.strpath]
+    b.write("def")
+    os.utime(b.strpath, (st_mtime + 1, st_mtime + 1))
+    assert converter.modified(a.strpath)
+    assert not converter.modified(c.strpath)
+    output = converter.convert_from_files(paths)[0]
+    assert "def" in output
+
+    st_mtime = os.stat(c.strpath).st_mtime
+    c.write("# Section\n# Section {#tag#}\n")
+    os.utime(c.strpath, (st_mtime + 1, st_mtime + 1))
+    output = converter.convert_from_files(paths)[0]
+    assert "[3](c.md#tag)" in output
+
+
+def test_pheasant_spill(tmpdir):
+    f = tmpdir.join("example.md")
+    f.write("# Title {#tag#}\n```python\n1\n```\nSee {#tag#}.\n")
+    path = f.strpath
+
+    converter = Pheasant(spill=tmpdir.join("pages").strpath)
+    assert converter.build_from_files([path]) is None
+    page = converter.pages[path]
+    assert page.spilled and page._source == ""
+    assert "{#tag#}" not in page.source
+    assert converter.convert_from_files([path])[0] == page.source
+
+
+def test_pheasant_tag_index(tmpdir):
+    a = tmpdir.join("a.md")
+    a.write("# Title\n## Section {#tag#}\n")
+    b = tmpdir.join("b.md")
+    b.write("# Title\nSee {#tag#}.\n")
+    index = tmpdir.join("tags.db").strpath
+
+    converter = Pheasant()
+    converter.header.set_config(index=index)
+    converter.convert_from_files([a.strpath, b.strpath])
+
+    converter = Pheasant()
+    output = "".join(converter.iter_convert(b.strpath))
+    assert "[1.1]" not in output
+    converter.header.set_config(index=index)
+    output = "".join(converter.iter_convert(b.strpath))
+    assert '[1.1](a.md#tag)' in output
@@ -3,3 +3,26 @@ from pheasant.renderers.jupyter.jupyter import Jupyter
 jupyter = Jupyter()
 jupyter.findall("{{3}}3{{5}}")
 jupyter.page
+
+
+def test_renderer_environment(tmpdir, monkeypatch):
+    from pheasant.core import renderer
+    from pheasant.renderers.number.number import Header
+
+    template = Header().config["header_template"]
+    assert Header().config["header_template"] is template
+
+    directory = tmpdir.mkdir("templates")
+    directory.join("a.jinja2").write("{{ x }}")
+    renderer.set_bytecode_cache(tmpdir.join("cache").strpath)
+    try:
+        env = renderer.get_environment([directory.strpath])
+        assert env.get_template("a.jinja2").render(x=1) == "1"
+        assert len(tmpdir.join("cache").listdir()) == 1
+        monkeypatch.setenv("XDG_CACHE_HOME", tmpdir.strpath)
+        renderer.set_bytecode_cache()
+        assert tmpdir.join("pheasant", "templates").check(dir=True)
+    finally:
+        renderer.bytecode_cache = None
+        for env in renderer.ENVIRONMENTS.values():
+            env.bytecode_cache = None
@@ -0,0 +1,22 @@
+from benchmarks.test_bench_core import resolve_by_groupdict
+from pheasant.core.pheasant import Pheasant
+
+
+def test_resolve_dispatch():
+    parser = Pheasant()["main"]
+    cells = [
+        "## Section {#tag-{k}#}\n",
+        "Text {{a}} and {{b#hide}} with {% file.py %}.\n",
+        "```python hide\nprint({k})\n```\n",
+        "~~~copy\nsource\n~~~\n",
+    ]
+    source = "".join(cells[k % 4].replace("{k}", str(k)) for k in range(10000))
+    parser.compile()
+    matches = list(parser.pattern.finditer(source))
+    assert len(matches) > 10000
+
+    for match in matches:
+        cell = parser.resolve(match)
+        render_name, context = resolve_by_groupdict(match)
+        assert cell.render_name == render_name
+        assert cell.context == context
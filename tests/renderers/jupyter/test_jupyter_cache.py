@@ -1,11 +1,17 @@
-from pheasant.renderers.jupyter.jupyter import Jupyter
+from pheasant.core.page import Page
+from pheasant.renderers.jupyter.jupyter import Dependency, Jupyter, get_bindings
+from pheasant.renderers.jupyter.kernel import Kernels
+from pheasant.utils.progress import progress_bar_manager
 
 
-def test_cache():
+def test_cache(tmpdir):
     jupyter = Jupyter()
     assert jupyter.cache == []
     assert jupyter.count == 0
 
+    jupyter.page = Page(tmpdir.join("example.md").strpath)
+    jupyter.enter()
+
     context = {"code": "1", "b": "b", "language": "python", "option": ""}
     template = "fenced_code"
     output = jupyter.execute_and_render("1", context, template)
@@ -14,7 +20,7 @@ def test_cache():
     assert len(cache) == 1
     cell = cache[jupyter.count - 1]
     assert cell.output == output
-    assert cell.valid
+    assert cell.key
 
     jupyter.execute_and_render("2", context, template)
     jupyter.execute_and_render("3", context, template)
@@ -22,16 +28,244 @@ def test_cache():
 
     assert jupyter.count == 4
     assert len(cache) == 4
+    jupyter.exit()
 
-    jupyter.count = 0
-
+    jupyter.enter()
+    assert jupyter.count == 0
     output = jupyter.execute_and_render("1", context, template)
     assert "cached" in output
 
     output = jupyter.execute_and_render("2*2", context, template)
     assert "cached" not in output
-    assert not cache[2].valid
 
     output = jupyter.execute_and_render("3", context, template)
-    assert "cached" not in output
-    assert not cache[3].valid
+    assert "cached" in output
+    assert len(jupyter.cache) == 3
+
+
+def test_cache_dependency(tmpdir):
+    jupyter = Jupyter()
+    jupyter.page = Page(tmpdir.join("example.md").strpath)
+    template = "fenced_code"
+
+    def run(codes):
+        jupyter.enter()
+        outputs = []
+        for code in codes:
+            context = {"code": code, "language": "python", "option": ""}
+            outputs.append(jupyter.execute_and_render(code, context, template))
+        jupyter.exit()
+        return ["cached" in output for output in outputs]
+
+    assert run(["a = 1", "b = 2", "a + 1", "b + 1"]) == [False] * 4
+    assert run(["a = 1", "b = 3", "a + 1", "b + 1"]) == [True, False, True, False]
+    assert run(["c = 1", "a = 1", "b = 3", "a + 1", "b + 1"]) == [False] + [True] * 4
+    assert run(["c = 1", "a = 1", "%who", "a + 1"]) == [True, True, False, False]
+
+
+def test_dependency():
+    dependency = Dependency()
+    key = dependency.key("a", {"x"})
+    dependency.update(key, {"x"})
+    assert dependency.key("b", {"y"}) == Dependency().key("b", {"y"})
+    assert dependency.key("b", {"x"}) != Dependency().key("b", {"x"})
+    dependency.update(dependency.key("c", None), None)
+    assert dependency.key("b", {"y"}) != Dependency().key("b", {"y"})
+
+
+def test_cache_dependency_late_binding(tmpdir):
+    jupyter = Jupyter()
+    jupyter.page = Page(tmpdir.join("example.md").strpath)
+    template = "fenced_code"
+
+    def run(codes):
+        jupyter.enter()
+        outputs = []
+        for code in codes:
+            context = {"code": code, "language": "python", "option": ""}
+            outputs.append(jupyter.execute_and_render(code, context, template))
+        jupyter.exit()
+        return outputs
+
+    codes = ["def f():\n    return g()", "def g():\n    return 1", "f()"]
+    assert '<code class="nohighlight">1</code>' in run(codes)[2]
+    codes[1] = "def g():\n    return 2"
+    jupyter.kernels.shutdown()  # The cached cells are replayed in a new kernel.
+    outputs = run(codes)
+    assert "cached" in outputs[0]
+    assert "cached" not in outputs[2]
+    assert '<code class="nohighlight">2</code>' in outputs[2]
+
+    codes = ["a = []", "b = a", "b.append(1)", "a"]
+    assert '<code class="nohighlight">[1]</code>' in run(codes)[3]
+    codes[2] = "b.append(2)"
+    jupyter.kernels.shutdown()
+    outputs = run(codes)
+    assert "cached" in outputs[1]
+    assert "cached" not in outputs[3]
+    assert '<code class="nohighlight">[2]</code>' in outputs[3]
+
+
+def test_cache_dependency_batch(tmpdir):
+    jupyter = Jupyter()
+    jupyter.page = Page(tmpdir.join("example.md").strpath)
+
+    def parse(source):
+        jupyter.enter()
+        output = jupyter.parse(source)
+        jupyter.exit()
+        return output
+
+    assert parse("```python\ny = 5\n```\n{{y+1}} {{y+2}}\n").endswith("6 7\n")
+    jupyter.kernels.shutdown()
+    output = parse("```python\ny = 5\n```\n{{y+3}} {{y+4}}\n")
+    assert "cached" in output
+    assert output.endswith("8 9\n")  # The cached cell is replayed for the batch.
+
+
+def test_dependency_bindings():
+    dependency = Dependency()
+    bindings = get_bindings("b = a", "python")
+    dependency.update(dependency.key("b = a", {"a", "b"}), {"a", "b"}, bindings)
+    key = dependency.key("a", {"a"})
+    dependency.update(dependency.key("b.append(1)", {"b"}), {"b"})
+    assert dependency.key("a", {"a"}) != key
+
+    dependency = Dependency()
+    bindings = get_bindings("import numpy as np\nx = np.sqrt(y)", "python")
+    dependency.update("k", {"np", "x", "y"}, bindings)
+    assert dependency.expand({"x"}) == {"x", "y"}  # Modules are not aliases.
+
+
+def test_cache_timeout(tmpdir):
+    jupyter = Jupyter()
+    jupyter.page = Page(tmpdir.join("example.md").strpath)
+    template = "fenced_code"
+    code = "import time\ntime.sleep(10)"
+
+    jupyter.enter()
+    context = {"code": code, "language": "python", "option": "timeout=0.5"}
+    output = jupyter.execute_and_render(code, context, template)
+    assert "TimeoutError: Cell execution timed out after 0.5 seconds." in output
+    assert jupyter.page.meta["failed"] is True
+    assert jupyter.cache == []
+    context = {"code": "1", "language": "python", "option": ""}
+    output = jupyter.execute_and_render("1", context, template)
+    assert '<code class="nohighlight">1</code>' in output
+    assert len(jupyter.cache) == 1
+    jupyter.exit()
+
+    jupyter.set_config(page_timeout=0.5)
+    jupyter.enter()
+    assert "failed" not in jupyter.page.meta
+    context = {"code": code, "language": "python", "option": ""}
+    output = jupyter.execute_and_render(code, context, template)
+    assert "Cell execution timed out after 0.5 seconds." in output
+    context = {"code": "2", "language": "python", "option": ""}
+    output = jupyter.execute_and_render("2", context, template)
+    assert "Page execution timed out after 0.5 seconds." in output
+    jupyter.exit()
+
+
+def test_cache_prelude(tmpdir):
+    jupyter = Jupyter()
+    jupyter.kernels = Kernels()
+    jupyter.set_config(prelude="x = 1")
+    template = "fenced_code"
+
+    def run(path, code):
+        jupyter.page = Page(tmpdir.join(path).strpath)
+        jupyter.enter()
+        context = {"code": code, "language": "python", "option": ""}
+        output = jupyter.execute_and_render(code, context, template)
+        jupyter.exit()
+        return output
+
+    assert '<code class="nohighlight">2</code>' in run("a.md", "x += 1; y = 2; x")
+    output = run("b.md", "x, 'y' in globals()")
+    assert '<code class="nohighlight">(1, False)</code>' in output
+    kernel = jupyter.kernels["python"]
+    assert kernel.checkpoint == "x = 1"
+    kernel.restart()
+    assert kernel.checkpoint == ""
+    assert "(1, False)" in run("c.md", "x, 'y' in globals()")
+
+    key = jupyter.cache[0].key
+    jupyter.set_config(prelude="x = 2")
+    assert "(2, False)" in run("c.md", "x, 'y' in globals()")
+    assert jupyter.cache[0].key != key
+    jupyter.kernels.shutdown()
+
+
+def test_cache_store(tmpdir):
+    jupyter = Jupyter()
+    jupyter.set_config(store=tmpdir.join("store").strpath)
+    template = "fenced_code"
+
+    def run(directory, codes):
+        jupyter.kernels = Kernels()  # A fresh kernel as on another runner.
+        jupyter.page = Page(tmpdir.mkdir(directory).join("a.md").strpath)
+        jupyter.enter()
+        outputs = []
+        for code in codes:
+            context = {"code": code, "language": "python", "option": ""}
+            outputs.append(jupyter.execute_and_render(code, context, template))
+        jupyter.exit()
+        jupyter.kernels.shutdown()
+        return outputs
+
+    run("x", ["a = 10", "b = 2", "a + 1"])
+    outputs = run("y", ["a = 10", "b = 3", "a + 1", "b + 1"])
+    assert ["cached" in output for output in outputs] == [True, False, True, False]
+    assert '<code class="nohighlight">11</code>' in outputs[2]
+    assert '<code class="nohighlight">4</code>' in outputs[3]
+    outputs = run("z", ["a = 10", "a * 3"])
+    assert "cached" in outputs[0]
+    assert '<code class="nohighlight">30</code>' in outputs[1]
+
+
+def test_cache_progress_total(tmpdir, monkeypatch):
+    jupyter = Jupyter()
+    path = tmpdir.join("example.md")
+    path.write("```python\n1\n```\n\n{{2}}\n")
+    jupyter.page = Page(path.strpath)
+    jupyter.page.source = jupyter.page.read()
+    jupyter.enter()
+    assert jupyter.progress_bar.total == 0  # Not a terminal.
+    jupyter.exit()
+
+    monkeypatch.setattr(progress_bar_manager, "isatty", lambda: True)
+    jupyter.enter()
+    assert jupyter.progress_bar.total == 2
+    for code, template in [("1", "fenced_code"), ("2", "inline_code")]:
+        context = {"code": code, "language": "python", "option": ""}
+        jupyter.execute_and_render(code, context, template)
+    jupyter.exit()
+
+    def findall():
+        raise AssertionError("Page scanned.")
+
+    monkeypatch.setattr(jupyter, "findall", findall)
+    jupyter.enter()
+    assert jupyter.progress_bar.total == 2
+    jupyter.exit()
+
+
+def test_cache_assets(tmpdir):
+    jupyter = Jupyter()
+    jupyter.page = Page(tmpdir.join("example.md").strpath)
+    context = {"code": "1", "language": "python", "option": ""}
+
+    def run():
+        jupyter.enter()
+        output = jupyter.execute_and_render("1", context, "fenced_code")
+        jupyter.exit()
+        return "cached" in output
+
+    assert not run()
+    assert run()
+    jupyter.set_config(assets=tmpdir.join("assets").strpath)
+    assert not run()  # Outputs refer to asset files only with the directory.
+    assert run()
+    jupyter.set_config(assets="")
+    assert not run()  # Not to refer to the asset files.
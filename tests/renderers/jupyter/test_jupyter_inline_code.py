@@ -15,3 +15,30 @@ def test_render_inline_code(jupyter, source_simple):
     next(splitter)
     cell = next(splitter)
     assert cell.context["code"] == "a;b"
+    assert "next" not in cell.context
+
+
+def test_render_inline_code_batch(jupyter, monkeypatch):
+    kernel = jupyter.kernels["python"]
+    batches = []
+    execute_many = kernel.execute_many
+
+    def spy(codes, output_hook=None, timeout=0, **kwargs):
+        batches.append(list(codes))
+        return execute_many(codes, output_hook, timeout, **kwargs)
+
+    monkeypatch.setattr(kernel, "execute_many", spy)
+    source = "{{x=3;x}} a {{x+1}}\nb {{x*2}}\n```python\nx=10\n```\n"
+    source += "{{x}} c {{#x}} {{x}}"
+    output = jupyter.parse(source)
+    assert output.startswith("3 a 4\nb 6\n")
+    assert output.endswith("10 c {{x}} 10")
+    assert batches[0] == ["x=3\nx", "x+1", "x*2"]
+    assert len(batches) == 4
+
+
+def test_render_inline_code_batch_error(jupyter):
+    kernel = jupyter.kernels["python"]
+    with pytest.raises(NameError):
+        jupyter.parse("{{v=1;v}} {{undefined_v}} {{v=2;v}}")
+    assert kernel.execute("v")[0]["data"]["text/plain"] == "1"
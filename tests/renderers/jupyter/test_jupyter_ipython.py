@@ -1,3 +1,5 @@
+import sys
+
 import altair as alt
 import holoviews as hv
 import pandas as pd
@@ -59,3 +61,36 @@ def test_ipython_select_last_display_data():
     assert len(outputs) == 2
     assert outputs[0]["type"] == "display_data"
     assert outputs[1]["text"] == "1\n2\n1\n2"
+
+
+def test_post_import_finder(tmpdir, monkeypatch):
+    tmpdir.join("pheasant_dummy_module.py").write("x = 1\n")
+    monkeypatch.syspath_prepend(tmpdir.strpath)
+    finder = ipython.PostImportFinder()
+    called = []
+    finder.register("pheasant_dummy_module", lambda: called.append(1))
+    assert finder in sys.meta_path
+    assert not called
+
+    import pheasant_dummy_module
+
+    assert pheasant_dummy_module.x == 1
+    assert called == [1]
+    assert not finder.hooks
+    finder.register("pheasant_dummy_module", lambda: called.append(2))
+    assert called == [1, 2]
+    sys.meta_path.remove(finder)
+    del sys.modules["pheasant_dummy_module"]
+
+
+def test_register_formatters_lazy():
+    kernel = kernels["python"]
+    kernel.restart()
+    kernel.execute("import sys")
+    outputs = kernel.execute("'pandas' in sys.modules")
+    assert outputs[0]["data"]["text/plain"] == "False"
+    kernel.execute("import pandas as pd")
+    code = "get_ipython().display_formatter.formatters['text/html']"
+    code += ".lookup_by_type(pd.DataFrame).__name__"
+    outputs = kernel.execute(code)
+    assert outputs[0]["data"]["text/plain"] == "'pandas_dataframe_to_html'"
@@ -1,6 +1,8 @@
 import pytest
 
-from pheasant.renderers.jupyter.kernel import kernels, output_hook_factory
+import pheasant.renderers.jupyter.kernel as kernel_module
+from pheasant.renderers.jupyter.kernel import (Kernels, kernels,
+                                               output_hook_factory)
 
 
 def test_kernel_names():
@@ -103,3 +105,100 @@ def test_inspect():
     assert outputs[0]["type"] == "stream"
     assert outputs[0]["name"] == "source"
     assert outputs[0]["text"].startswith('class Jupyter')
+
+
+def test_execute_many():
+    kernel = kernels["python"]
+    results = kernel.execute_many(["x = 10", "print(x)", "x * 2"])
+    assert len(results) == 3
+    assert results[0][0] == []
+    assert results[1][0][0]["text"] == "10"
+    assert results[2][0][0]["data"]["text/plain"] == "20"
+    assert all("total" in report for _, report in results)
+
+    with pytest.raises(NameError):
+        kernel.execute_many(["undefined_name", "y = 1"])
+    assert kernel.execute("y")[0]["data"]["text/plain"] == "1"
+
+    codes = ["y = 2", "undefined_name", "y = 3"]
+    results = kernel.execute_many(codes, stop_on_error=True)
+    assert len(results) == 2
+    assert results[1][0][0]["ename"] == "NameError"
+    assert kernel.execute("y")[0]["data"]["text/plain"] == "2"
+
+
+def test_execute_timeout():
+    kernel = kernels["python"]
+    codes = ["import time\ntime.sleep(10)", "z = 3", "z"]
+    results = kernel.execute_many(codes, timeout=0.5)
+    assert results[0][0][0]["ename"] == "TimeoutError"
+    assert results[0][0][0]["timeout"] is True
+    assert len(results[0][0]) == 1
+    assert results[2][0][0]["data"]["text/plain"] == "3"
+
+
+def test_execute_timeout_restart(monkeypatch):
+    monkeypatch.setattr(kernel_module, "INTERRUPT_TIMEOUT", 0.5)
+    kernel = kernels["python"]
+    ignore = "import signal, time\nsignal.signal(signal.SIGINT, signal.SIG_IGN)"
+    codes = ["w = 1", "w", ignore + "\ntime.sleep(30)", "w"]
+    results = kernel.execute_many(codes, timeout=0.5)
+    assert results[1][0][0]["data"]["text/plain"] == "1"
+    assert "total" in results[1][1]
+    assert results[2][0][0]["ename"] == "TimeoutError"
+    assert results[3][0][0]["ename"] == "TimeoutError"
+    with pytest.raises(NameError):
+        kernel.execute("w")  # Restarted.
+
+
+def test_kernels_spares():
+    pool = Kernels(spares=1)
+    kernel_name = pool.get_kernel_name("python")
+    kernel = pool.get_kernel(kernel_name)
+    kernel.execute("a = 1")
+    for thread in list(pool.threads):
+        thread.join()
+    assert len(pool.pool[kernel_name]) == 1
+    spare = pool.pool[kernel_name][0]
+    manager = spare.manager
+
+    pool.restart()
+    assert kernel.manager is manager
+    assert spare.manager is None
+    with pytest.raises(NameError):
+        kernel.execute("a")
+    outputs = kernel.execute("register_formatters.__name__")
+    assert outputs[0]["data"]["text/plain"] == "'register_formatters'"
+
+    pool.shutdown()
+    assert not pool.kernels
+    assert not pool.pool[kernel_name]
+    assert not pool.threads
+
+
+def test_kernels_fork():
+    pools = [Kernels(fork=True, preload="x = 42"), Kernels(fork=True, preload="x = 42")]
+    first, second = [pool["python"] for pool in pools]
+    assert first.zygote is second.zygote
+    first.execute("x = 1")
+    assert first.checkpoint == "x = 42"
+    assert second.execute("x")[0]["data"]["text/plain"] == "42"
+    pids = [kernel.execute("import os\nos.getpid()")[0] for kernel in [first, second]]
+    assert pids[0] != pids[1]
+
+    results = first.execute_many(["import time\ntime.sleep(10)", "x"], timeout=0.5)
+    assert results[0][0][0]["ename"] == "TimeoutError"
+    assert results[1][0][0]["data"]["text/plain"] == "1"
+    first.restart()
+    assert first.execute("x")[0]["data"]["text/plain"] == "42"
+    assert first.checkpoint == "x = 42"
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_kernels_fork_magic():
+    pool = Kernels(fork=True, preload="%matplotlib inline")
+    with pytest.warns(RuntimeWarning):
+        kernel = pool["python"]
+    assert kernel.zygote is None
+    pool.shutdown()
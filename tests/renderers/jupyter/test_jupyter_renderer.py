@@ -1,3 +1,5 @@
+import os
+
 from pheasant.renderers.jupyter.ipython import extra_html
 from pheasant.renderers.jupyter.kernel import kernels
 
@@ -77,3 +79,27 @@ def test_render_fenced_code_with_option():
 def test_render_find_all(jupyter):
     source = "{{2*3}}\n```python\n1\n```\n{{2}}\n```python\n1\n```\n"
     assert len(jupyter.findall(source)) == 4
+
+
+def test_render_assets(tmpdir):
+    from pheasant.renderers.jupyter.jupyter import Jupyter
+
+    jupyter = Jupyter()
+    directory = tmpdir.join("assets").strpath
+    jupyter.set_config(assets=directory)
+    code = "from IPython.display import Image, SVG\n"
+    code += "svg = '<svg xmlns=\"http://www.w3.org/2000/svg\" width=\"1\"/>'\n"
+    code += "SVG(svg)"
+    output = jupyter.parse(f"```python\n{code}\n```\n")
+    assert '<img alt="image/svg+xml" src="pheasant-asset://' in output
+    output = jupyter.parse("```python\nImage(data=b'abc', format='png')\n```\n")
+    assert '<img alt="image/png" src="pheasant-asset://' in output
+    output = jupyter.parse("```python\nImage(data=b'abc', format='png')\n```\n")
+    files = sorted(os.listdir(directory), key=lambda x: x[-3:])
+    assert [file[-3:] for file in files] == ["png", "svg"]
+    with open(os.path.join(directory, files[0]), "rb") as file:
+        assert file.read() == b"abc"
+
+    jupyter.set_config(assets="")
+    output = jupyter.parse("```python\nSVG(svg)\n```\n")
+    assert "<svg" in output
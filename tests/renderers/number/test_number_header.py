@@ -1,7 +1,7 @@
 import re
 from typing import Pattern
 
-from pheasant.renderers.number.number import split_number
+from pheasant.renderers.number.number import Header, split_number
 
 
 def test_complile_pattern():
@@ -94,6 +94,21 @@ def test_header_with_number(header):
     assert '<span class="number">1.2.3</span>' in output
 
 
+def test_header_memo():
+    header = Header()
+    source = "# A\n## B\n#Fig C\nabc\n\n"
+    output = header.parse(source)
+    assert len(header.memo) == 3
+    header.start()
+    assert header.parse(source) == output
+    assert len(header.memo) == 3
+    output = header.parse(source)
+    assert '<span class="number">2</span> <span class="title">A' in output
+    assert len(header.memo) == 6
+    header.set_config(prefix=dict(figure="Fig."))
+    assert header.memo == {}
+
+
 def test_header_with_link(header):
     output = header.parse("# title (https://example.com)\n")
     assert '<span class="link"><a href="https://example.com"' in output
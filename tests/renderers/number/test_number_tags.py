@@ -0,0 +1,14 @@
+from pheasant.renderers.number.tags import TagIndex
+
+
+def test_tag_index(tmpdir):
+    index = TagIndex(tmpdir.join("cache", "tags.db").strpath)
+    assert index.get("a") is None
+    index.update("x.md", {"a": {"title": "A"}, "b": {"title": "B"}})
+    index.update("y.md", {"c": {"title": "C"}})
+    assert index.get("a") == {"title": "A"}
+    index.update("x.md", {"b": {"title": "B2"}})
+    assert index.get("a") is None
+    assert index.get("b") == {"title": "B2"}
+    index.close()
+    assert TagIndex(index.path).get("c") == {"title": "C"}
@@ -1,10 +1,28 @@
+import io
+import os
+import socket
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
 from click.testing import CliRunner
 
 from pheasant import __version__
+from pheasant.app.daemon import (Daemon, make_private_directory, peer_uid,
+                                 socket_path)
 from pheasant.main import cli
 from pheasant.renderers.jupyter.kernel import kernels
 
 
+@pytest.fixture(autouse=True)
+def socket_path_env(tmpdir_factory, monkeypatch):
+    """Point the CLI to a socket of no daemon, so that it converts in the tests."""
+    path = tmpdir_factory.mktemp("socket").join("d.sock").strpath
+    monkeypatch.setenv("PHEASANT_SOCKET", path)
+
+
 def test_main_version():
     runner = CliRunner()
     result = runner.invoke(cli, ["--version"])
@@ -12,7 +30,8 @@ def test_main_version():
     assert __version__ in result.output
 
 
-def test_main_command():
+def test_main_command(tmpdir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", tmpdir.strpath)
     runner = CliRunner()
     with runner.isolated_filesystem():
         with open("example.md", "w") as f:
@@ -27,9 +46,29 @@ def test_main_command():
         result = runner.invoke(cli, ["run", "example.md", "--force", "-vv"])
         assert result.exit_code == 0
         assert len(kernels.kernels) == 1
+        result = runner.invoke(cli, ["run", "example.md", "--profile", "a.json"])
+        assert result.exit_code == 0
+        assert os.path.exists("a.json")
+        assert tmpdir.join("pheasant", "templates").check(dir=True)
+        assert not os.path.exists(os.path.join(".pheasant_cache", "templates"))
+
+        result = runner.invoke(cli, ["convert", "example.md"])
+        assert result.exit_code == 0
+        with open("example.out.md") as f:
+            output = f.read()
+        assert '<code class="python">1</code>' in output
 
         result = runner.invoke(cli, ["list"])
         assert "example.md (cached," in result.output
+        result = runner.invoke(cli, ["list", "--ignore", "ex*"])
+        assert "collected 0 files." in result.output
+        result = runner.invoke(cli, ["cache", "stats"])
+        assert "caches: 1 " in result.output
+        assert "orphans: 0 (0B)" in result.output
+        result = runner.invoke(cli, ["cache", "gc", "--max-size", "1x"])
+        assert result.exit_code != 0
+        result = runner.invoke(cli, ["cache", "gc", "--max-size", "1", "-n"])
+        assert "example.md.cache will be deleted." in result.output
         result = runner.invoke(cli, ["clean"], input="n\n")
         assert "Aborted" in result.output
         result = runner.invoke(cli, ["clean"], input="y\n")
@@ -60,3 +99,105 @@ def test_main_script():
         assert "[html]" in result.output
         assert '<code class="python">print(&#39;abc&#39;)</code>' in result.output
         assert '<code class="nohighlight">abc</code>' in result.output
+
+
+def test_main_daemon(tmpdir, monkeypatch):
+    path = tmpdir.join("d.sock").strpath
+    monkeypatch.setenv("PHEASANT_SOCKET", path)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["daemon", "--stop"])
+    assert "No daemon is running." in result.output
+
+    args = [sys.executable, "-c", "from pheasant.main import cli; cli()", "daemon"]
+    process = subprocess.Popen(args, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            pytest.fail("Daemon didn't start.")
+        time.sleep(0.01)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    with runner.isolated_filesystem():
+        with open("example.md", "w") as f:
+            f.write("# Title\n```python\n1\n```\n")
+
+        result = runner.invoke(cli, ["convert", "example.md", "-v"])
+        assert result.exit_code == 0
+        assert "Elapsed time" in result.output
+        with open("example.out.md") as f:
+            output = f.read()
+        assert '<code class="python">1</code>' in output
+
+        with open("example.md", "w") as f:
+            f.write("```python\nimport uuid\nuuid.uuid4()\n```\n")
+
+        def convert(*args):
+            result = runner.invoke(cli, ["convert", "example.md", *args])
+            assert result.exit_code == 0
+            with open("example.out.md") as f:
+                return f.read()
+
+        output = convert()
+        assert convert() == output
+        assert convert("--force") != output
+
+        os.mkdir("sub")
+        os.chdir("sub")
+        with open("example.md", "w") as f:
+            f.write("```python\nimport os\nprint(os.getcwd())\n```\n")
+        assert os.getcwd() in convert()
+        os.chdir("..")
+
+    result = runner.invoke(cli, ["daemon", "--stop"])
+    assert "Daemon stopped." in result.output
+    assert process.wait(10) == 0
+    assert not os.path.exists(path)
+
+
+def test_main_daemon_private(tmpdir, monkeypatch):
+    monkeypatch.delenv("PHEASANT_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", tmpdir.strpath)
+    assert socket_path() == tmpdir.join("pheasant.sock").strpath
+
+    directory = tmpdir.join("private").strpath
+    make_private_directory(directory)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    os.chmod(directory, 0o755)
+    with pytest.raises(PermissionError):
+        make_private_directory(directory)
+
+    left, right = socket.socketpair(socket.AF_UNIX)
+    with left, right:
+        assert peer_uid(left) in [os.getuid(), None]
+    daemon = Daemon(tmpdir.join("d.sock").strpath)
+    assert not daemon.converter.jupyter.config["safe"]  # Same as the local CLI.
+    file = io.BytesIO(b'{"command": "stop"}\n')
+    assert daemon.handle(file, os.getuid() + 1)
+    assert b"Permission denied." in file.getvalue()
+
+
+def test_main_tag_index():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.makedirs(os.path.join("docs", "sub"))
+        with open(os.path.join("docs", "a.md"), "w") as f:
+            f.write("# Title\n## Section {#tag#}\n")
+        with open(os.path.join("docs", "sub", "b.md"), "w") as f:
+            f.write("# Title\nSee {#tag#}.\n")
+        os.chdir("docs")
+        result = runner.invoke(cli, ["convert", "--local", "a.md", "sub/b.md"])
+        assert result.exit_code == 0
+        os.chdir("..")
+        assert os.path.exists(os.path.join("docs", ".pheasant_cache", "tags.db"))
+        assert not os.path.exists(".pheasant_cache")
+        args = ["convert", "--local", "docs/a.md", "docs/sub/b.md"]
+        assert runner.invoke(cli, args).exit_code == 0
+        assert not os.path.exists(".pheasant_cache")
+
+        # A page converted alone from another directory finds the tags.
+        args = ["convert", "--local", "docs/sub/b.md"]
+        assert runner.invoke(cli, args).exit_code == 0
+        with open(os.path.join("docs", "sub", "b.out.md")) as f:
+            assert "(../a.md#tag)" in f.read()
+        assert not os.path.exists(os.path.join("docs", "sub", ".pheasant_cache"))
@@ -0,0 +1,49 @@
+import json
+
+from pheasant.core.pheasant import Pheasant
+from pheasant.utils.profile import Profiler, profiler
+
+
+def test_profiler():
+    profiler = Profiler()
+    with profiler.timer("a", "timers", "kernel"):
+        pass
+    assert profiler.pages == {}
+
+    profiler.enabled = True
+    with profiler.cell("a", count=1):
+        with profiler.timer("a", "timers", "kernel"):
+            pass
+    with profiler.renderer("a", "header"):
+        with profiler.renderer("a", "jupyter"):
+            pass
+    assert list(profiler.iterate(iter([1, 2]), "a", "stages", "main")) == [1, 2]
+    page = profiler.pages["a"]
+    assert list(page["renderers"]) == ["header"]
+    assert list(page["stages"]) == ["main"]
+    cell = page["cells"][0]
+    assert cell["count"] == 1
+    assert cell["total"] >= cell["kernel"] == page["timers"]["kernel"]
+    report = profiler.report()
+    assert report["total"] == page["stages"]["main"]
+    assert report["timers"]["kernel"] == page["timers"]["kernel"]
+
+
+def test_profiler_pheasant(tmpdir):
+    f = tmpdir.join("example.md")
+    f.write("# Title\n## Section\n```python\n1\n```\n")
+    path = f.strpath
+    output = tmpdir.join("profile.json").strpath
+
+    converter = Pheasant()
+    with profiler.profile(output):
+        converter.convert_from_files([path])
+    assert not profiler.enabled
+    with open(output) as file:
+        report = json.load(file)
+    page = report["pages"][path]
+    assert list(page["stages"]) == ["main", "link"]
+    assert list(page["renderers"]) == ["header", "jupyter"]
+    assert "template" in page["timers"]
+    assert page["cells"][0]["count"] == 1
+    assert path in profiler.summary()[1]